@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Per-request JSON CPU cost of each codec backend on the proxy's hot path.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_json_codec.py [--prompt-tokens 100000] [--choices 8]
+"""
+
+import argparse
+import random
+import string
+import timeit
+
+from app.codec import BACKENDS
+
+
+def _text(n_chars: int) -> str:
+    words = ["".join(random.choices(string.ascii_lowercase, k=random.randint(2, 9))) for _ in range(2000)]
+    out, size = [], 0
+    while size < n_chars:
+        word = random.choice(words)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)
+
+
+def build_request(prompt_tokens: int) -> dict:
+    # ~4 characters per token, spread over a RAG-style conversation
+    chunk = prompt_tokens * 4 // 10
+    messages = [{"role": "system", "content": _text(2000)}]
+    for _ in range(10):
+        messages.append({"role": "user", "content": _text(chunk)})
+    return {"model": "test-model", "messages": messages, "max_tokens": 512, "stream": False}
+
+
+def build_response(choices: int) -> dict:
+    def logprobs():
+        return [
+            {
+                "token": word,
+                "logprob": -random.random(),
+                "top_logprobs": [{"token": w, "logprob": -random.random()} for w in _text(40).split()[:5]],
+            }
+            for word in _text(2048).split()[:512]
+        ]
+
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": 1700000000,
+        "model": "test-model",
+        "choices": [
+            {
+                "index": i,
+                "message": {"role": "assistant", "content": _text(2048)},
+                "logprobs": {"content": logprobs()},
+                "finish_reason": "stop",
+            }
+            for i in range(choices)
+        ],
+        "usage": {"prompt_tokens": 100000, "completion_tokens": 4096, "total_tokens": 104096},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompt-tokens", type=int, default=100_000)
+    parser.add_argument("--choices", type=int, default=8)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    stdlib = BACKENDS["json"]()
+    request_body = stdlib.dumps(build_request(args.prompt_tokens))
+    response_body = stdlib.dumps(build_response(args.choices))
+    record = {"text": "a" * 64 + ":" + "b" * 64, "signature_ecdsa": "0x" + "c" * 130}
+
+    print(f"request body: {len(request_body) / 1024:.0f} KiB, response body: {len(response_body) / 1024:.0f} KiB")
+    print(f"{'codec':<8} {'request':>12} {'response':>12} {'record':>10} {'total':>12} {'saving':>8}")
+
+    baseline = None
+    # stdlib first: savings are reported relative to it
+    for name in ["json", "orjson", "msgspec"]:
+        codec = BACKENDS[name]()
+        if codec is None:
+            print(f"{name:<8} not installed")
+            continue
+
+        def per_call(fn) -> float:
+            return min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number * 1e6
+
+        # Request path: parse the body, re-serialize it when a rewrite is needed
+        request_us = per_call(lambda: codec.dumps(codec.loads(request_body)))
+        # Non-stream response path: parse upstream body, render it for the client
+        response_us = per_call(lambda: codec.dumps(codec.loads(response_body)))
+        # Signature record: serialize into the cache, parse on /signature
+        record_us = per_call(lambda: codec.loads(codec.dumps(record)))
+
+        total = request_us + response_us + record_us
+        baseline = baseline or total
+        saving = (1 - total / baseline) * 100
+        print(
+            f"{name:<8} {request_us:>10.0f}us {response_us:>10.0f}us {record_us:>8.1f}us "
+            f"{total:>10.0f}us {saving:>7.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Signatures per second for each signing backend, on one core.
+
+Needs the proxy's runtime dependencies (the quote module loads the GPU/dstack SDKs).
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_signing.py [--seconds 2]
+"""
+
+import argparse
+import time
+
+from app.quote import quote
+
+
+def signatures_per_second(sign, seconds: float) -> float:
+    content = "ab" * 32 + ":" + "cd" * 32
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(20):
+            sign(content)
+        count += 20
+    return count / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    account = quote.ecdsa_context._raw_account
+    backends = {
+        "ecdsa/eth_account": quote.EthAccountBackend(account),
+        "ed25519/cryptography": quote.Ed25519Backend(quote.ed25519_context._ed_private),
+    }
+    if quote.coincurve is not None:
+        backends["ecdsa/coincurve"] = quote.CoincurveBackend(bytes(account.key))
+    else:
+        print("coincurve not installed, skipping its backend")
+
+    print(f"{'backend':<22} {'sig/s':>10} {'us/sig':>10}")
+    for name, backend in backends.items():
+        rate = signatures_per_second(backend.sign, args.seconds)
+        print(f"{name:<22} {rate:>10.0f} {1e6 / rate:>10.1f}")
+
+    # What one eager completion pays with the configured backends
+    def sign_both(content: str) -> None:
+        quote.ecdsa_context.sign(content)
+        quote.ed25519_context.sign(content)
+
+    rate = signatures_per_second(sign_both, args.seconds)
+    print(f"\ncompletions/s per core with {quote.ecdsa_context._backend.name} + ed25519: {rate:.0f}")
+
+
+if __name__ == "__main__":
+    main()
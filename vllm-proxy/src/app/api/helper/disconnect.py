@@ -0,0 +1,53 @@
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+from fastapi import Request
+
+from app.metrics import Counter
+
+T = TypeVar("T")
+
+CLIENT_DISCONNECTS = Counter(
+    "client_disconnects",
+    "Requests abandoned by the client before completion; their upstream work is cancelled",
+    ("mode",),
+)
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before the upstream answered."""
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Return once the ASGI server reports that the client has disconnected."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Optional[Request], awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first
+    Cancelling an upstream httpx request closes its connection, which makes vLLM
+    abort the sequence.
+    Raises:
+        ClientDisconnected: The client went away first
+    """
+    if request is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        watcher.cancel()
+        task.cancel()
+        raise
+    watcher.cancel()
+    if task.done():
+        return task.result()
+    task.cancel()
+    await asyncio.wait((task,))
+    raise ClientDisconnected()
+
@@ -0,0 +1,76 @@
+import re
+from typing import Iterator, Optional
+
+from app.codec import loads
+
+# vLLM puts the completion id first in every payload, so a short prefix scan finds it
+ID_SCAN_LIMIT = 256
+_ID_PREFIX = re.compile(rb'\s*\{\s*"id"\s*:\s*"([^"\\]*)"')
+_EVENT_SEPARATORS = (b"\r\n\r\n", b"\n\n")
+
+
+class SSEFramer:
+    """
+    Incremental Server-Sent Events framer.
+
+    Upstream chunks may split or merge events arbitrarily; the framer buffers
+    across chunk boundaries and yields the data of each complete event.
+    """
+
+    def __init__(self, max_buffer: int = 1 << 20) -> None:
+        self.max_buffer = max_buffer
+        self._buffer = bytearray()
+        self._scan_from = 0
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        """Add a chunk and yield the `data:` payload of every completed event."""
+        self._buffer += chunk
+        while True:
+            end, separator = self._find_separator()
+            if end < 0:
+                break
+            event = bytes(self._buffer[:end])
+            del self._buffer[: end + len(separator)]
+            self._scan_from = 0
+            data = _event_data(event)
+            if data is not None:
+                yield data
+
+        # A separator may straddle the next chunk boundary, rescan its possible start
+        self._scan_from = max(0, len(self._buffer) - 3)
+        if len(self._buffer) > self.max_buffer:
+            raise ValueError(f"SSE event exceeds {self.max_buffer} bytes")
+
+    def _find_separator(self) -> tuple[int, bytes]:
+        found, found_separator = -1, b""
+        for separator in _EVENT_SEPARATORS:
+            index = self._buffer.find(separator, self._scan_from)
+            if index >= 0 and (found < 0 or index < found):
+                found, found_separator = index, separator
+        return found, found_separator
+
+
+def _event_data(event: bytes) -> Optional[bytes]:
+    """Join the `data:` lines of one event, None if it carries no data."""
+    lines = []
+    for line in event.splitlines():
+        if line.startswith(b"data:"):
+            value = line[5:]
+            lines.append(value[1:] if value.startswith(b" ") else value)
+    if not lines:
+        return None
+    return b"\n".join(lines)
+
+
+def extract_id(data: bytes) -> Optional[str]:
+    """
+    Extract the top-level "id" of a JSON payload.
+    Scans a bounded prefix first and only falls back to a full parse when that fails.
+    """
+    match = _ID_PREFIX.match(data, 0, ID_SCAN_LIMIT)
+    if match:
+        return match.group(1).decode()
+    payload = loads(data)
+    if isinstance(payload, dict):
+        return payload.get("id")
+    return None
@@ -1,5 +1,16 @@
+from typing import Any
+
 from fastapi.responses import JSONResponse
 
+from app.codec import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured JSON codec (orjson/msgspec when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
 
 def ok(data: dict = None):
     return data or dict()
@@ -11,6 +22,7 @@ def error(
     type: str = "error_type",
     param: str = None,
     code: str = None,
+    headers: dict = None,
 ):
     content = dict(
         error=dict(
@@ -20,7 +32,7 @@ def error(
             code=code,
         )
     )
-    return JSONResponse(status_code=status_code, content=content)
+    return FastJSONResponse(status_code=status_code, content=content, headers=headers)
 
 
 def unexpect_error(context: str = None, error: Exception = None):
@@ -57,4 +69,27 @@ def http_exception(status_code: int, message: str):
 
 
 def not_found(message: str):
-    return error(status_code=404, message=message, type="not_found")
\ No newline at end of file
+    return error(status_code=404, message=message, type="not_found")
+
+
+def service_unavailable(message: str, retry_after: int):
+    return error(
+        status_code=503,
+        message=message,
+        type="service_unavailable",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def too_many_requests(message: str, retry_after: int):
+    return error(
+        status_code=429,
+        message=message,
+        type="too_many_requests",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def client_closed_request():
+    # nginx's non-standard status for a request the client abandoned
+    return error(status_code=499, message="Client closed request", type="client_closed_request")
@@ -1,42 +1,67 @@
+import asyncio
 import json
-import os
 from hashlib import sha256
 from typing import Optional
 
-import httpx
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Header, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Query
 from fastapi.responses import (
-    JSONResponse,
     PlainTextResponse,
     StreamingResponse,
     Response,
 )
+from starlette.background import BackgroundTask
 
 from app.api.helper.auth import verify_authorization_header
+from app.api.helper.disconnect import CLIENT_DISCONNECTS, ClientDisconnected, cancel_on_disconnect
+from app.api.helper.sse import SSEFramer, extract_id
 from app.api.response.response import (
+    FastJSONResponse,
+    client_closed_request,
     invalid_signing_algo,
     not_found,
+    service_unavailable,
     unexpect_error,
 )
 from app.cache.cache import cache
+from app.codec import dumps, loads
 from app.logger import log
+from app.metrics import merge_exposition, render as render_metrics
+from app.quote.attestation import AttestationBusy, attestation_service
+from app.quote.prewarm import prewarm_pool
 from app.quote.quote import (
     ECDSA,
     ED25519,
     ecdsa_context,
     ed25519_context,
-    generate_attestation,
-    sign_message,
 )
+from app.signing.batch import batch_signer
+from app.signing.chat import (
+    BATCH,
+    LAZY,
+    SIGNING_MODE,
+    is_signable,
+    seal_chat,
+    sign_chat,
+    sign_record,
+)
+from app.signing.executor import signer
+from app.signing.record import (
+    compact_key_id,
+    decode_record,
+    encode_record,
+    signer_entry,
+    signer_key_id,
+)
+from app.upstream import admission
+from app.upstream.pool import PREFIX, upstream_pool
+from app.upstream.prefix import prefix_key
 
 router = APIRouter(tags=["openai"])
 
-VLLM_BASE_URL = os.getenv("VLLM_BASE_URL", "http://vllm:8000")
-VLLM_URL = f"{VLLM_BASE_URL}/v1/chat/completions"
-VLLM_COMPLETIONS_URL = f"{VLLM_BASE_URL}/v1/completions"
-VLLM_METRICS_URL = f"{VLLM_BASE_URL}/metrics"
-VLLM_MODELS_URL = f"{VLLM_BASE_URL}/v1/models"
-TIMEOUT = 60 * 10
+CHAT_COMPLETIONS_PATH = "/v1/chat/completions"
+COMPLETIONS_PATH = "/v1/completions"
+METRICS_PATH = "/metrics"
+MODELS_PATH = "/v1/models"
 
 COMMON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
 
@@ -50,21 +75,52 @@ def hash(payload: str):
     return sha256(payload.encode()).hexdigest()
 
 
-def sign_chat(text: str):
-    return dict(
-        text=text,
-        signature_ecdsa=sign_message(ecdsa_context, text),
-        signing_address_ecdsa=ecdsa_context.signing_address,
-        signature_ed25519=sign_message(ed25519_context, text),
-        signing_address_ed25519=ed25519_context.signing_address,
-    )
+async def record_chat(chat_id: str, text: str) -> None:
+    """
+    Cache the signed request/response hashes of a chat
+    In lazy signing mode only the sealed hashes are stored and signed on first retrieval,
+    in batch mode the record holds a Merkle root signature and the chat's inclusion proof
+    """
+    if SIGNING_MODE == LAZY:
+        record = seal_chat(text)
+    elif SIGNING_MODE == BATCH:
+        record = await batch_signer.sign(text)
+    else:
+        record = await signer.run(sign_chat, text)
+    await store_record(chat_id, record)
+
+
+async def store_record(chat_id: str, record: dict) -> None:
+    key_id, value = encode_record(record)
+    if key_id is not None:
+        await cache.set_signer(key_id, signer_entry(record))
+    await cache.set_chat(chat_id, value)
+
+
+async def load_record(value: str | bytes) -> dict:
+    key_id = compact_key_id(value)
+    if key_id is None:
+        return decode_record(value)
+    signer_value = await cache.get_signer(key_id)
+    if not signer_value:
+        ecdsa_address, ed25519_address = ecdsa_context.signing_address, ed25519_context.signing_address
+        if key_id == signer_key_id(ecdsa_address, ed25519_address):
+            # Our own record whose registry entry is gone (restart or eviction): republish it
+            signer_value = signer_entry(
+                dict(signing_address_ecdsa=ecdsa_address, signing_address_ed25519=ed25519_address)
+            )
+            await cache.set_signer(key_id, signer_value, force=True)
+    return decode_record(value, loads(signer_value) if signer_value else None)
 
 
 async def stream_vllm_response(
-    url: str,
+    path: str,
     request_body: bytes,
     modified_request_body: bytes,
     request_hash: Optional[str] = None,
+    routing_key: Optional[bytes] = None,
+    tenant: str = "",
+    request: Optional[Request] = None,
 ):
     """
     Handle streaming vllm request
@@ -74,6 +130,10 @@ async def stream_vllm_response(
         request_hash: Optional hash from request header (X-Request-Hash). Used by trusted clients to provide
                      pre-calculated request hash, avoiding redundant hash computation. Falls back to
                      calculating hash from request_body if not provided
+        routing_key: Optional prompt prefix for prefix-aware backend routing
+        tenant: Tenant whose interactive lane the request is queued in when backends are full
+        request: The client request, watched for disconnects while the upstream stream is opened;
+                 once streaming, Starlette cancels the body on disconnect
     Returns:
         A streaming response
     """
@@ -86,46 +146,70 @@ async def stream_vllm_response(
 
     chat_id = None
     h = sha256()
+    framer = SSEFramer()
 
     async def generate_stream(response):
         nonlocal chat_id, h
-        async for chunk in response.aiter_text():
-            h.update(chunk.encode())
-            # Extract the cache key (data.id) from the first chunk
-            if not chat_id:
-                data = chunk.strip("data: ").strip()
-                if not data or data == "[DONE]":
-                    continue
-                try:
-                    chunk_data = json.loads(data)
-                    chat_id = chunk_data.get("id")
-                except Exception as e:
-                    error_message = f"Failed to parse the first chunk: {e}\n The original data is: {data}"
-                    log.error(error_message)
-                    raise Exception(error_message)
-
-            yield chunk
-
-        response_sha256 = h.hexdigest()
-        # Cache the full request and response using the extracted cache key
-        if chat_id:
-            cache.set_chat(
-                chat_id, json.dumps(sign_chat(f"{request_sha256}:{response_sha256}"))
-            )
-        else:
-            error_message = "Chat id could not be extracted from the response"
-            log.error(error_message)
-            raise Exception(error_message)
+        try:
+            # Forward the upstream bytes as-is: what is hashed is exactly what the client receives
+            async for chunk in response.aiter_bytes():
+                h.update(chunk)
+                # Extract the cache key (data.id) from the first complete event
+                if not chat_id:
+                    for data in framer.feed(chunk):
+                        if data == b"[DONE]":
+                            continue
+                        try:
+                            chat_id = extract_id(data)
+                        except Exception as e:
+                            error_message = f"Failed to parse the first chunk: {e}\n The original data is: {data!r}"
+                            log.error(error_message)
+                            raise Exception(error_message)
+                        if chat_id:
+                            break
+
+                yield chunk
+
+            response_sha256 = h.hexdigest()
+            # Cache the full request and response using the extracted cache key
+            if chat_id:
+                await record_chat(chat_id, f"{request_sha256}:{response_sha256}")
+            else:
+                error_message = "Chat id could not be extracted from the response"
+                log.error(error_message)
+                raise Exception(error_message)
+        except asyncio.CancelledError:
+            # StreamingResponse cancels the body when the client disconnects: the chat is
+            # never signed, and closing the response below makes vLLM abort the generation
+            CLIENT_DISCONNECTS.inc(mode="stream")
+            log.info("Client disconnected, aborting upstream stream")
+            raise
+        finally:
+            # Starlette skips the background task when the body raises, so release here too
+            await upstream_pool.close(response)
 
-    client = httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT), headers=COMMON_HEADERS)
     # Forward the request to the vllm backend
-    req = client.build_request("POST", url, content=modified_request_body)
-    response = await client.send(req, stream=True)
+    try:
+        response = await cancel_on_disconnect(
+            request,
+            upstream_pool.open_stream(
+                "POST",
+                path,
+                routing_key,
+                admission.Lane(tenant, admission.INTERACTIVE),
+                content=modified_request_body,
+                headers=COMMON_HEADERS,
+            ),
+        )
+    except ClientDisconnected:
+        CLIENT_DISCONNECTS.inc(mode="stream")
+        return client_closed_request()
     # If not 200, return the error response directly without streaming
     if response.status_code != 200:
-        error_content = await response.aread()
-        await response.aclose()
-        await client.aclose()
+        try:
+            error_content = await response.aread()
+        finally:
+            await upstream_pool.close(response)
 
         return Response(
             content=error_content,
@@ -135,17 +219,20 @@ async def stream_vllm_response(
 
     return StreamingResponse(
         generate_stream(response),
-        background=BackgroundTasks([response.aclose, client.aclose]),
+        background=BackgroundTask(upstream_pool.close, response),
         media_type="text/event-stream",
     )
 
 
 # Function to handle non-streaming responses
 async def non_stream_vllm_response(
-    url: str,
+    path: str,
     request_body: bytes,
     modified_request_body: bytes,
     request_hash: Optional[str] = None,
+    routing_key: Optional[bytes] = None,
+    tenant: str = "",
+    request: Optional[Request] = None,
 ):
     """
     Handle non-streaming responses
@@ -155,8 +242,11 @@ async def non_stream_vllm_response(
         request_hash: Optional hash from request header (X-Request-Hash). Used by trusted clients to provide
                      pre-calculated request hash, avoiding redundant hash computation. Falls back to
                      calculating hash from request_body if not provided
+        routing_key: Optional prompt prefix for prefix-aware backend routing
+        tenant: Tenant whose batch lane the request is queued in when backends are full
+        request: The client request, watched for disconnects to cancel the upstream request
     Returns:
-        The response data
+        The upstream response body, forwarded verbatim
     """
     if request_hash:
         request_sha256 = request_hash
@@ -165,25 +255,46 @@ async def non_stream_vllm_response(
         request_sha256 = sha256(request_body).hexdigest()
         log.debug(f"Calculated request hash: {request_sha256}")
 
-    async with httpx.AsyncClient(
-        timeout=httpx.Timeout(TIMEOUT), headers=COMMON_HEADERS
-    ) as client:
-        response = await client.post(url, content=modified_request_body)
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-
-        response_data = response.json()
-        # Cache the request-response pair using the chat ID
-        chat_id = response_data.get("id")
-        if chat_id:
-            response_sha256 = sha256(response.content).hexdigest()
-            cache.set_chat(
-                chat_id, json.dumps(sign_chat(f"{request_sha256}:{response_sha256}"))
-            )
-        else:
-            raise Exception("Chat id could not be extracted from the response")
+    try:
+        response = await cancel_on_disconnect(
+            request,
+            upstream_pool.request(
+                "POST",
+                path,
+                routing_key,
+                admission.Lane(tenant, admission.BATCH),
+                content=modified_request_body,
+                headers=COMMON_HEADERS,
+            ),
+        )
+    except ClientDisconnected:
+        CLIENT_DISCONNECTS.inc(mode="non_stream")
+        log.info("Client disconnected, cancelled upstream request")
+        return client_closed_request()
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+
+    # Cache the request-response pair using the chat ID
+    chat_id = extract_id(response.content)
+    if chat_id:
+        # Signed over exactly the bytes returned to the client
+        response_sha256 = sha256(response.content).hexdigest()
+        await record_chat(chat_id, f"{request_sha256}:{response_sha256}")
+    else:
+        raise Exception("Chat id could not be extracted from the response")
+
+    return Response(
+        content=response.content,
+        media_type=response.headers.get("content-type", "application/json"),
+    )
+
 
-        return response_data
+def _has_empty_tool_calls(message: dict) -> bool:
+    return (
+        "tool_calls" in message
+        and isinstance(message["tool_calls"], list)
+        and len(message["tool_calls"]) == 0
+    )
 
 
 def strip_empty_tool_calls(payload: dict) -> dict:
@@ -198,11 +309,7 @@ def strip_empty_tool_calls(payload: dict) -> dict:
     filtered_messages = []
     for message in payload["messages"]:
         # If the message has tool_calls, filter out empty ones
-        if (
-            "tool_calls" in message
-            and isinstance(message["tool_calls"], list)
-            and len(message["tool_calls"]) == 0
-        ):
+        if _has_empty_tool_calls(message):
             del message["tool_calls"]
         filtered_messages.append(message)
 
@@ -210,6 +317,37 @@ def strip_empty_tool_calls(payload: dict) -> dict:
     return payload
 
 
+def prepare_request_body(request_body: bytes) -> tuple[dict, bytes]:
+    """
+    Parse the client request and build the body forwarded to vLLM
+    Args:
+        request_body: The original request body
+    Returns:
+        The parsed request and the body to forward. The original bytes are
+        forwarded untouched unless empty tool calls had to be stripped.
+    """
+    request_json = loads(request_body)
+    # Cheap byte scan first: without a "tool_calls" key there is nothing to strip
+    if b'"tool_calls"' not in request_body:
+        return request_json, request_body
+    messages = request_json.get("messages")
+    if not isinstance(messages, list) or not any(
+        isinstance(message, dict) and _has_empty_tool_calls(message)
+        for message in messages
+    ):
+        return request_json, request_body
+
+    modified_json = strip_empty_tool_calls(request_json)
+    return modified_json, dumps(modified_json)
+
+
+def routing_key(request_json: dict) -> Optional[bytes]:
+    """Prompt prefix the upstream pool routes on, only computed in prefix routing."""
+    if upstream_pool.routing != PREFIX:
+        return None
+    return prefix_key(request_json)
+
+
 # Get attestation report of intel quote and nvidia payload
 @router.get("/attestation/report", dependencies=[Depends(verify_authorization_header)])
 async def attestation_report(
@@ -228,15 +366,38 @@ async def attestation_report(
     if signing_address and context.signing_address.lower() != signing_address.lower():
         raise HTTPException(status_code=404, detail="Signing address not found on this server")
     try:
-        attestation = generate_attestation(context, nonce)
+        attestation = None
+        if nonce and prewarm_pool.enabled:
+            attestation = await prewarm_pool.redeem(context, nonce)
+        if attestation is None:
+            attestation = await attestation_service.report(context, nonce)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
+    except AttestationBusy as exc:
+        return service_unavailable("Attestation service is busy, retry later", exc.retry_after)
 
     resp = dict(attestation)
     resp["all_attestations"] = [attestation]
     return resp
 
 
+# Issue a nonce whose attestation report is pre-generated
+@router.get("/attestation/nonce", dependencies=[Depends(verify_authorization_header)])
+async def attestation_nonce(signing_algo: str | None = None):
+    signing_algo = ECDSA if signing_algo is None else signing_algo
+    if signing_algo not in [ECDSA, ED25519]:
+        return invalid_signing_algo()
+    if not prewarm_pool.enabled:
+        return not_found("Nonce issuing is not enabled on this server")
+
+    context = ecdsa_context if signing_algo == ECDSA else ed25519_context
+    return dict(
+        nonce=prewarm_pool.issue(context),
+        signing_algo=signing_algo,
+        expires_in=prewarm_pool.nonce_ttl,
+    )
+
+
 # VLLM Chat completions
 @router.post("/chat/completions", dependencies=[Depends(verify_authorization_header)])
 async def chat_completions(
@@ -245,26 +406,35 @@ async def chat_completions(
 ):
     # Keep original request body to calculate the request hash for attestation
     request_body = await request.body()
-    request_json = json.loads(request_body)
-    modified_json = strip_empty_tool_calls(request_json)
+    modified_json, modified_request_body = prepare_request_body(request_body)
 
     # Check if the request is for streaming or non-streaming
     is_stream = modified_json.get(
         "stream", False
     )  # Default to non-streaming if not specified
 
-    modified_request_body = json.dumps(modified_json).encode("utf-8")
     if is_stream:
         # Create a streaming response
         return await stream_vllm_response(
-            VLLM_URL, request_body, modified_request_body, x_request_hash
+            CHAT_COMPLETIONS_PATH,
+            request_body,
+            modified_request_body,
+            x_request_hash,
+            routing_key(modified_json),
+            request.headers.get(admission.ADMISSION_TENANT_HEADER, ""),
+            request,
         )
     else:
         # Handle non-streaming response
-        response_data = await non_stream_vllm_response(
-            VLLM_URL, request_body, modified_request_body, x_request_hash
+        return await non_stream_vllm_response(
+            CHAT_COMPLETIONS_PATH,
+            request_body,
+            modified_request_body,
+            x_request_hash,
+            routing_key(modified_json),
+            request.headers.get(admission.ADMISSION_TENANT_HEADER, ""),
+            request,
         )
-        return JSONResponse(content=response_data)
 
 
 # VLLM completions
@@ -275,77 +445,107 @@ async def completions(
 ):
     # Keep original request body to calculate the request hash for attestation
     request_body = await request.body()
-    request_json = json.loads(request_body)
-    modified_json = strip_empty_tool_calls(request_json)
+    modified_json, modified_request_body = prepare_request_body(request_body)
 
     # Check if the request is for streaming or non-streaming
     is_stream = modified_json.get(
         "stream", False
     )  # Default to non-streaming if not specified
 
-    modified_request_body = json.dumps(modified_json).encode("utf-8")
     if is_stream:
         # Create a streaming response
         return await stream_vllm_response(
-            VLLM_COMPLETIONS_URL, request_body, modified_request_body, x_request_hash
+            COMPLETIONS_PATH,
+            request_body,
+            modified_request_body,
+            x_request_hash,
+            routing_key(modified_json),
+            request.headers.get(admission.ADMISSION_TENANT_HEADER, ""),
+            request,
         )
     else:
         # Handle non-streaming response
-        response_data = await non_stream_vllm_response(
-            VLLM_COMPLETIONS_URL, request_body, modified_request_body, x_request_hash
+        return await non_stream_vllm_response(
+            COMPLETIONS_PATH,
+            request_body,
+            modified_request_body,
+            x_request_hash,
+            routing_key(modified_json),
+            request.headers.get(admission.ADMISSION_TENANT_HEADER, ""),
+            request,
         )
-        return JSONResponse(content=response_data)
 
 
 # Get signature for chat_id of chat history
 @router.get("/signature/{chat_id}", dependencies=[Depends(verify_authorization_header)])
 async def signature(request: Request, chat_id: str, signing_algo: str = None):
-    cache_value = cache.get_chat(chat_id)
+    cache_value = await cache.get_chat(chat_id)
     if cache_value is None:
         return not_found("Chat id not found or expired")
 
-    signature = None
     signing_algo = ECDSA if signing_algo is None else signing_algo
 
     # Retrieve the cached request and response
     try:
-        value = json.loads(cache_value)
+        value = await load_record(cache_value)
     except Exception as e:
         log.error(f"Failed to parse the cache value: {cache_value} {e}")
         return unexpect_error("Failed to parse the cache value", e)
 
-    signing_address = None
-    if signing_algo == ECDSA:
-        signature = value.get("signature_ecdsa")
-        signing_address = value.get("signing_address_ecdsa")
-    elif signing_algo == ED25519:
-        signature = value.get("signature_ed25519")
-        signing_address = value.get("signing_address_ed25519")
-    else:
+    if signing_algo not in [ECDSA, ED25519]:
         return invalid_signing_algo()
 
-    return dict(
+    # Lazy signing: sign on first retrieval and memoize the signature in the cache
+    if value.get(f"signature_{signing_algo}") is None and "seal" in value:
+        if not is_signable(value):
+            log.error(f"Refusing to sign a chat record not sealed by this server: {chat_id}")
+            return not_found("Chat signature not available on this server")
+        value = await signer.run(sign_record, value, signing_algo)
+        await store_record(chat_id, value)
+
+    signature = value.get(f"signature_{signing_algo}")
+    signing_address = value.get(f"signing_address_{signing_algo}")
+
+    result = dict(
         text=value.get("text"),
         signature=signature,
         signing_address=signing_address,
         signing_algo=signing_algo,
     )
+    # Batch signing: the signature covers merkle_root, which commits to text through merkle_proof
+    if "merkle_root" in value:
+        result["merkle_root"] = value["merkle_root"]
+        result["merkle_proof"] = value["merkle_proof"]
+    return result
 
 
 # Metrics of vLLM instance
 @router.get("/metrics")
 async def metrics(request: Request):
-    async with httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT)) as client:
-        response = await client.get(VLLM_METRICS_URL)
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-        return PlainTextResponse(response.text)
+    results = await upstream_pool.request_each("GET", METRICS_PATH)
+    scraped = []
+    for backend, response in results:
+        if isinstance(response, Exception) or response.status_code != 200:
+            log.warning("Failed to scrape metrics from vLLM backend %s: %s", backend.url, response)
+            continue
+        scraped.append((backend.url, response.text))
+    if not scraped:
+        _, response = results[0]
+        if isinstance(response, Exception):
+            raise response
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    if len(results) == 1:
+        vllm_metrics = scraped[0][1]
+    else:
+        # One series per replica, told apart by a backend label
+        vllm_metrics = merge_exposition(scraped, "backend")
+    # Append the proxy's own metrics to vLLM's
+    return PlainTextResponse(vllm_metrics.rstrip("\n") + "\n" + render_metrics())
 
 
 @router.get("/models")
 async def models(request: Request):
-    async with httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT)) as client:
-        response = await client.get(VLLM_MODELS_URL)
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-        return JSONResponse(content=response.json())
+    response = await upstream_pool.request_one("GET", MODELS_PATH)
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    return FastJSONResponse(content=loads(response.content))
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class MicroBatcher(Generic[T]):
+    """
+    Collects items and hands them to `handler` in batches.
+
+    - A batch goes out when it reaches `max_items` or `window_ms` after its first item
+    - Each batch is handled in its own task, so adding an item never waits for one
+    - The handler owns its errors; whatever it raises is only logged by asyncio
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[T]], Awaitable[None]],
+        window_ms: float,
+        max_items: int,
+    ) -> None:
+        self._handler = handler
+        self.window = window_ms / 1000
+        self.max_items = max_items
+        self._pending: list[T] = []
+        self._handling = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        """Items waiting for their batch or in a batch still being handled."""
+        return len(self._pending) + self._handling
+
+    def add(self, item: T) -> None:
+        """Add an item to the current batch."""
+        self._pending.append(item)
+        if len(self._pending) >= self.max_items:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self) -> None:
+        """Hand the current batch to the handler now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._handling += len(batch)
+            task = asyncio.create_task(self._handle(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, batch: list[T]) -> None:
+        try:
+            await self._handler(batch)
+        finally:
+            self._handling -= len(batch)
+
+    async def aclose(self) -> None:
+        """Flush the current batch and wait for every batch in flight."""
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -1,32 +1,63 @@
 import json
 import os
+import time
 from typing import Optional
 
 from app.logger import log
+from app.metrics import Counter, Gauge
 
 from .local_cache import LocalCache
 from .redis import RedisCache
+from .write_behind import WriteBehindQueue
 
 CHAT_CACHE_EXPIRATION = int(os.getenv("CHAT_CACHE_EXPIRATION", "1200"))
+# through: await the Redis write on the response path
+# behind: write locally, queue the Redis write and flush it in pipelined batches
+CACHE_WRITE_MODE = os.getenv("CACHE_WRITE_MODE", "through").lower()
+
+REDIS_FIRST = "redis-first"
+LOCAL_FIRST = "local-first"
+# redis-first: ask Redis, fall back to local on a miss or failure
+# local-first: answer from the local layer when it has the key, Redis otherwise
+CACHE_READ_STRATEGY = os.getenv("CACHE_READ_STRATEGY", REDIS_FIRST).lower()
+
+CACHE_READS = Counter("cache_reads", "Chat cache lookups per layer", ("layer", "result"))
 MODEL_NAME = os.getenv("MODEL_NAME")
 if not MODEL_NAME:
     raise ValueError("MODEL_NAME is not set")
 
 CHAT_PREFIX = "chat"
+SIGNER_PREFIX = "signer"
+# Signer entries live twice the chat expiration; republishing them at least every minute
+# also restores one that Redis evicted under memory pressure
+SIGNER_REPUBLISH_SECONDS = min(CHAT_CACHE_EXPIRATION / 2, 60)
 
 
 class ChatCache:
     """
     Dual-layer cache: Local + optional Redis for cross-server sharing.
 
-    - Redis enabled: Write-through to both, read from Redis first
+    - Redis enabled: Write-through (or write-behind) to both, read per CACHE_READ_STRATEGY;
+      a Redis hit is copied to local with its remaining TTL
     - Redis disabled: Local-only mode
     - Redis fails: Automatic fallback to local, retry on next operation
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, write_mode: str = CACHE_WRITE_MODE, read_strategy: str = CACHE_READ_STRATEGY
+    ) -> None:
         self._local = LocalCache(expiration=CHAT_CACHE_EXPIRATION)
         self._redis = self._init_redis()
+        self.read_strategy = read_strategy
+        # Signers published by this process: key -> (republish after, value)
+        self._signers: dict[str, tuple[float, str]] = {}
+        self._write_behind = (
+            WriteBehindQueue(self._redis) if self._redis and write_mode == "behind" else None
+        )
+
+    @property
+    def write_behind_depth(self) -> int:
+        return self._write_behind.depth if self._write_behind else 0
 
     def _init_redis(self) -> Optional[RedisCache]:
         """Initialize Redis only if REDIS_HOST is configured."""
@@ -39,40 +70,112 @@ class ChatCache:
         """Build namespaced cache key: model:prefix:key"""
         return f"{MODEL_NAME}:{prefix}:{key}"
 
-    def _write_string(self, key: str, value: str) -> None:
+    async def _write_string(self, key: str, value: str | bytes) -> None:
         """Write string to local and optionally to Redis."""
         self._local.set(key, value)
 
-        if self._redis:
+        if self._write_behind:
+            self._write_behind.put(key, value)
+        elif self._redis:
             try:
-                self._redis.set_string(key, value)
+                await self._redis.set_string(key, value)
             except Exception as exc:
                 log.warning("Redis write failed for %s: %s", key, exc)
 
-    def _read_string(self, key: str) -> Optional[str]:
-        """Read string from Redis first, fallback to local."""
-        if self._redis:
-            try:
-                value = self._redis.get_string(key)
-                if value:
-                    return value
-            except Exception as exc:
-                log.warning("Redis read failed for %s: %s", key, exc)
+    def _read_local(self, key: str) -> Optional[str | bytes]:
+        value = self._local.get(key)
+        CACHE_READS.inc(layer="local", result="hit" if value is not None else "miss")
+        return value
+
+    async def _read_redis(self, key: str) -> Optional[bytes]:
+        """Read string from Redis and copy a hit into the local layer."""
+        try:
+            value, ttl = await self._redis.get_with_ttl(key)
+        except Exception as exc:
+            log.warning("Redis read failed for %s: %s", key, exc)
+            CACHE_READS.inc(layer="redis", result="error")
+            return None
+        if not value:
+            CACHE_READS.inc(layer="redis", result="miss")
+            return None
+        CACHE_READS.inc(layer="redis", result="hit")
+        self._local.set(key, value, ttl, read=True)
+        return value
+
+    async def _read_string(self, key: str) -> Optional[str | bytes]:
+        """Read string using the configured strategy, fallback to local."""
+        if not self._redis:
+            return self._read_local(key)
+
+        if self.read_strategy == LOCAL_FIRST:
+            value = self._read_local(key)
+            return value if value is not None else await self._read_redis(key)
 
-        return self._local.get(key)
+        value = await self._read_redis(key)
+        return value if value is not None else self._read_local(key)
 
     # Chat operations
 
-    def set_chat(self, chat_id: str, chat: str) -> None:
+    async def set_chat(self, chat_id: str, chat: str | bytes) -> None:
         """Store chat completion data."""
         key = self._make_key(CHAT_PREFIX, chat_id)
-        self._write_string(key, chat)
+        await self._write_string(key, chat)
 
-    def get_chat(self, chat_id: str) -> Optional[str]:
+    async def get_chat(self, chat_id: str) -> Optional[str | bytes]:
         """Retrieve chat completion data."""
         key = self._make_key(CHAT_PREFIX, chat_id)
-        return self._read_string(key)
-
+        return await self._read_string(key)
+
+    # Signer operations
+
+    async def set_signer(self, key_id: str, signer: str, force: bool = False) -> None:
+        """
+        Publish the signing addresses that compact records refer to by key id.
+        The entry lives twice the chat expiration and is republished every
+        SIGNER_REPUBLISH_SECONDS, so it outlives the records written in between;
+        a failed Redis write is retried on the next call.
+        """
+        key = self._make_key(SIGNER_PREFIX, key_id)
+        published = self._signers.get(key)
+        if not force and published and published[0] > time.monotonic():
+            return
+        # Claimed before the write so concurrent records do not all publish it
+        self._signers[key] = (time.monotonic() + SIGNER_REPUBLISH_SECONDS, signer)
+        if not self._redis:
+            return
+        try:
+            stored = await self._redis.set_string(key, signer, expiration=2 * CHAT_CACHE_EXPIRATION)
+        except Exception as exc:
+            log.warning("Redis write failed for %s: %s", key, exc)
+            stored = False
+        if not stored:
+            self._signers[key] = (0.0, signer)
+
+    async def get_signer(self, key_id: str) -> Optional[str | bytes]:
+        """Retrieve the signing addresses behind a key id."""
+        key = self._make_key(SIGNER_PREFIX, key_id)
+        if key in self._signers:
+            return self._signers[key][1]
+        return await self._read_string(key)
+
+    async def aclose(self) -> None:
+        """Flush queued writes and release the Redis connection pool."""
+        if self._write_behind:
+            await self._write_behind.aclose()
+        if self._redis:
+            await self._redis.aclose()
 
 
 cache = ChatCache()
+
+Gauge(
+    "cache_local_bytes",
+    "Bytes charged to the local cache layer",
+    callback=lambda: cache._local.bytes,
+)
+
+Gauge(
+    "cache_write_behind_depth",
+    "Redis writes queued or in flight in write-behind mode",
+    callback=lambda: cache.write_behind_depth,
+)
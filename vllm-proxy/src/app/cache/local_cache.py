@@ -1,18 +1,123 @@
-from typing import Optional
+import os
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
 
-from cachetools import TTLCache
+from app.metrics import Counter
+
+# Memory budget of the local layer, charged per entry by its real size
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# Approximate per-entry bookkeeping: ordered dict node, hash slot and entry tuple
+ENTRY_OVERHEAD = 200
+# Seconds between full sweeps for expired entries when the budget is exceeded
+SWEEP_INTERVAL = 1.0
+
+LOCAL_EVICTIONS = Counter(
+    "cache_local_evictions",
+    "Local cache entries removed, by reason (capacity means before expiry)",
+    ("reason",),
+)
+
+
+class _Entry(NamedTuple):
+    value: str
+    expires_at: float
+    size: int
 
 
 class LocalCache:
-    """Class for local cache implementations"""
+    """
+    Byte-budgeted cache with per-entry TTL, tuned for write-once, read-maybe signatures.
+
+    - New entries wait in the unread segment; the first hit moves them to the read segment
+    - Over budget, expired entries of both segments go first, then read entries
+      (least recently used first), and only then unread ones (oldest first), so a
+      signature is not evicted before anyone fetched it while there is anything else to drop
+    - Expired entries are dropped on access, from the cold end of both segments on every
+      write and, at most once per SWEEP_INTERVAL, by a full sweep when over budget
+    """
+
+    def __init__(
+        self,
+        expiration: int,
+        max_bytes: int = LOCAL_CACHE_MAX_BYTES,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.expiration = expiration
+        self.max_bytes = max_bytes
+        self._timer = timer
+        self._unread: OrderedDict[str, _Entry] = OrderedDict()
+        self._read: OrderedDict[str, _Entry] = OrderedDict()
+        self._last_sweep = float("-inf")
+        self.bytes = 0
 
-    def __init__(self, expiration: int):
-        self.cache = TTLCache(maxsize=1000, ttl=expiration)
+    def __len__(self) -> int:
+        return len(self._unread) + len(self._read)
 
-    def set(self, key: str, value: str):
-        """Set a value in the cache"""
-        self.cache[key] = value
+    def set(self, key: str, value: str, ttl: Optional[float] = None, read: bool = False):
+        """
+        Set a value in the cache, optionally with a shorter TTL than the default.
+        `read` files it as already read, e.g. when it is copied from Redis for a reader.
+        """
+        now = self._timer()
+        ttl = self.expiration if ttl is None else min(ttl, self.expiration)
+        self._discard(key)
+        entry = _Entry(value, now + ttl, sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD)
+        if entry.size > self.max_bytes:
+            LOCAL_EVICTIONS.inc(reason="capacity")
+            return
+        (self._read if read else self._unread)[key] = entry
+        self.bytes += entry.size
+        self._evict(now)
 
     def get(self, key: str) -> Optional[str]:
         """Get a value from the cache"""
-        return self.cache.get(key)
+        entry = self._unread.get(key) or self._read.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._timer():
+            self._discard(key)
+            LOCAL_EVICTIONS.inc(reason="expired")
+            return None
+
+        if key in self._unread:
+            del self._unread[key]
+            self._read[key] = entry
+        else:
+            self._read.move_to_end(key)
+        return entry.value
+
+    def _discard(self, key: str) -> None:
+        entry = self._unread.pop(key, None) or self._read.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def _drop_expired(self, segment: OrderedDict[str, _Entry], now: float, sweep: bool) -> None:
+        """Drop expired entries from the cold end, or from the whole segment when sweeping."""
+        if sweep:
+            expired = [key for key, entry in segment.items() if entry.expires_at <= now]
+        else:
+            expired = []
+            for key, entry in segment.items():
+                if entry.expires_at > now:
+                    break
+                expired.append(key)
+        for key in expired:
+            self._discard(key)
+            LOCAL_EVICTIONS.inc(reason="expired")
+
+    def _evict(self, now: float) -> None:
+        self._drop_expired(self._unread, now, sweep=False)
+        self._drop_expired(self._read, now, sweep=False)
+        if self.bytes > self.max_bytes and now - self._last_sweep >= SWEEP_INTERVAL:
+            # Entries with a shorter TTL can expire behind live ones
+            self._last_sweep = now
+            self._drop_expired(self._unread, now, sweep=True)
+            self._drop_expired(self._read, now, sweep=True)
+
+        while self.bytes > self.max_bytes:
+            segment = self._read or self._unread
+            key, entry = next(iter(segment.items()))
+            self._discard(key)
+            LOCAL_EVICTIONS.inc(reason="expired" if entry.expires_at <= now else "capacity")
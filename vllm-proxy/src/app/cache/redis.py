@@ -3,19 +3,22 @@ import time
 from typing import Optional
 
 import redis
+import redis.asyncio as aioredis
 from app.logger import log
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+# Connections shared by all concurrent requests
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
 
 # Circuit breaker: skip Redis for this duration after failure
 CIRCUIT_BREAKER_DURATION = 10  # seconds
 
 
 class RedisCache:
-    """Redis cache implementation that reads connection details from environment variables"""
+    """Async Redis cache implementation that reads connection details from environment variables"""
 
     def __init__(
         self,
@@ -24,14 +27,18 @@ class RedisCache:
         port: int = REDIS_PORT,
         password: str = REDIS_PASSWORD,
         db: int = REDIS_DB,
+        max_connections: int = REDIS_MAX_CONNECTIONS,
     ):
-        """Initialize Redis connection (lazy - allows hot-adding Redis later)"""
-        self.redis_client = redis.Redis(
+        """Initialize Redis connection pool (lazy - allows hot-adding Redis later)"""
+        self.pool = aioredis.ConnectionPool(
             host=host, port=port, db=db, password=password,
             socket_connect_timeout=0.1,  # 100ms - fail fast
             socket_timeout=0.1,  # 100ms - fail fast
-            decode_responses=True
+            max_connections=max_connections,
+            # Values are returned as bytes: records may be JSON text or packed binary
+            decode_responses=False
         )
+        self.redis_client = aioredis.Redis(connection_pool=self.pool)
         self.expiration = expiration
         self._circuit_breaker_until = 0.0  # timestamp to skip Redis until
 
@@ -44,12 +51,13 @@ class RedisCache:
         self._circuit_breaker_until = time.time() + CIRCUIT_BREAKER_DURATION
         log.warning("Redis circuit breaker opened for %ds", CIRCUIT_BREAKER_DURATION)
 
-    def set_string(self, key: str, value: str) -> bool:
+    async def set_string(self, key: str, value: str | bytes, expiration: Optional[int] = None) -> bool:
         """
         Store chat data in Redis
         Args:
             key: unique identifier for the key
-            value: string value to store
+            value: string or bytes value to store
+            expiration: seconds to keep the key, defaults to the cache expiration
         Returns:
             bool: True if successful, False otherwise
         """
@@ -57,32 +65,74 @@ class RedisCache:
             return False
 
         try:
-            self.redis_client.set(key, value, ex=self.expiration)
+            await self.redis_client.set(key, value, ex=expiration or self.expiration)
             return True
         except redis.RedisError:
             self._open_circuit()
             return False
 
-    def get_string(self, key: str) -> Optional[str]:
+    async def set_many(self, items: list[tuple[str, str | bytes]]) -> bool:
+        """
+        Store several strings in one pipelined round trip
+        Args:
+            items: (key, value) pairs
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if self._is_circuit_open():
+            return False
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in items:
+                    pipe.set(key, value, ex=self.expiration)
+                await pipe.execute()
+            return True
+        except redis.RedisError:
+            self._open_circuit()
+            return False
+
+    async def get_string(self, key: str) -> Optional[bytes]:
         """
         Retrieve chat data from Redis
         Args:
             key: unique identifier for the key
         Returns:
-            str: cached value if exists, None otherwise
+            bytes: cached value if exists, None otherwise
         """
         if self._is_circuit_open():
             return None
 
         try:
-            # decode_responses=True handles decoding automatically
-            return self.redis_client.get(key)
+            return await self.redis_client.get(key)
         except redis.RedisError as e:
             log.error("Redis get error: %s", e)
             self._open_circuit()
             return None
 
-    def delete(self, key: str) -> bool:
+    async def get_with_ttl(self, key: str) -> tuple[Optional[bytes], Optional[float]]:
+        """
+        Retrieve chat data and its remaining lifetime in one round trip
+        Args:
+            key: unique identifier for the key
+        Returns:
+            (value, seconds left) - the TTL is None when the key has no expiry or is missing
+        """
+        if self._is_circuit_open():
+            return None, None
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                value, pttl = await pipe.execute()
+        except redis.RedisError as e:
+            log.error("Redis get error: %s", e)
+            self._open_circuit()
+            return None, None
+        return value, (pttl / 1000 if pttl and pttl > 0 else None)
+
+    async def delete(self, key: str) -> bool:
         """
         Delete data from Redis
         Args:
@@ -91,11 +141,11 @@ class RedisCache:
             bool: True if successful, False otherwise
         """
         try:
-            return bool(self.redis_client.delete(key))
+            return bool(await self.redis_client.delete(key))
         except redis.RedisError:
             return False
 
-    def get_all_values(self, prefix: str) -> list[str]:
+    async def get_all_values(self, prefix: str) -> list[bytes]:
         """
         Get all values with a given prefix using SCAN (non-blocking)
         """
@@ -106,8 +156,8 @@ class RedisCache:
             values = []
             pattern = f"{prefix}:*"
             # Use SCAN instead of KEYS to avoid blocking Redis
-            for key in self.redis_client.scan_iter(match=pattern, count=100):
-                value = self.redis_client.get(key)
+            async for key in self.redis_client.scan_iter(match=pattern, count=100):
+                value = await self.redis_client.get(key)
                 if value:
                     values.append(value)
             return values
@@ -115,3 +165,8 @@ class RedisCache:
             log.error("Redis scan error: %s", e)
             self._open_circuit()
             return []
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        await self.redis_client.aclose()
+        await self.pool.disconnect()
@@ -0,0 +1,69 @@
+import os
+
+from app.batching import MicroBatcher
+from app.logger import log
+from app.metrics import Counter, Summary
+
+from .redis import RedisCache
+
+# Writes are pipelined in batches of up to CACHE_WRITE_BEHIND_MAX_ITEMS, collected over at most the window
+CACHE_WRITE_BEHIND_WINDOW_MS = float(os.getenv("CACHE_WRITE_BEHIND_WINDOW_MS", "10"))
+CACHE_WRITE_BEHIND_MAX_ITEMS = int(os.getenv("CACHE_WRITE_BEHIND_MAX_ITEMS", "256"))
+# Writes queued or in flight before new ones are dropped (they stay in the local cache)
+CACHE_WRITE_BEHIND_MAX_PENDING = int(os.getenv("CACHE_WRITE_BEHIND_MAX_PENDING", "10000"))
+
+WRITE_BEHIND_BATCH_SIZE = Summary("cache_write_behind_batch_size", "Keys written per Redis pipeline")
+WRITE_BEHIND_DROPPED = Counter(
+    "cache_write_behind_dropped", "Redis writes dropped because the write-behind queue was full"
+)
+WRITE_BEHIND_FAILED = Counter(
+    "cache_write_behind_failed", "Redis writes lost because their pipeline failed"
+)
+
+
+class WriteBehindQueue:
+    """
+    Queues Redis writes and flushes them as pipelined batches.
+
+    Writes never wait for Redis; when the queue is full they are dropped and
+    counted, and the value is only in the local cache.
+    """
+
+    def __init__(
+        self,
+        redis: RedisCache,
+        window_ms: float = CACHE_WRITE_BEHIND_WINDOW_MS,
+        max_items: int = CACHE_WRITE_BEHIND_MAX_ITEMS,
+        max_pending: int = CACHE_WRITE_BEHIND_MAX_PENDING,
+    ) -> None:
+        self._redis = redis
+        self.max_pending = max_pending
+        self._batcher: MicroBatcher[tuple[str, str]] = MicroBatcher(
+            self._write_batch, window_ms, max_items
+        )
+
+    @property
+    def depth(self) -> int:
+        """Writes queued or in flight."""
+        return self._batcher.depth
+
+    def put(self, key: str, value: str) -> bool:
+        """Queue a write; False if it was dropped."""
+        if self.depth >= self.max_pending:
+            WRITE_BEHIND_DROPPED.inc()
+            return False
+        self._batcher.add((key, value))
+        return True
+
+    async def _write_batch(self, batch: list[tuple[str, str]]) -> None:
+        WRITE_BEHIND_BATCH_SIZE.observe(len(batch))
+        try:
+            if not await self._redis.set_many(batch):
+                WRITE_BEHIND_FAILED.inc(len(batch))
+        except Exception as exc:
+            log.warning("Redis write-behind of %d keys failed: %s", len(batch), exc)
+            WRITE_BEHIND_FAILED.inc(len(batch))
+
+    async def aclose(self) -> None:
+        """Write whatever is queued and wait for in-flight pipelines."""
+        await self._batcher.aclose()
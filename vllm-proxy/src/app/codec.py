@@ -0,0 +1,95 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from app.logger import log
+
+# auto | orjson | msgspec | json
+JSON_CODEC = os.getenv("JSON_CODEC", "auto").lower()
+
+
+@dataclass(frozen=True)
+class JsonCodec:
+    name: str
+    loads: Callable[[bytes | str], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+STDLIB_CODEC = JsonCodec(name="json", loads=json.loads, dumps=_stdlib_dumps)
+
+
+def _orjson_codec() -> Optional[JsonCodec]:
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return JsonCodec(name="orjson", loads=orjson.loads, dumps=orjson.dumps)
+
+
+def _msgspec_codec() -> Optional[JsonCodec]:
+    try:
+        import msgspec
+    except ImportError:
+        return None
+
+    # msgspec.DecodeError is a ValueError, like json.JSONDecodeError
+    return JsonCodec(
+        name="msgspec",
+        loads=msgspec.json.Decoder().decode,
+        dumps=msgspec.json.Encoder().encode,
+    )
+
+
+BACKENDS: dict[str, Callable[[], Optional[JsonCodec]]] = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": lambda: STDLIB_CODEC,
+}
+
+
+def select_codec(name: str = JSON_CODEC) -> JsonCodec:
+    """Pick the configured backend, the fastest installed one for 'auto'."""
+    candidates = ["orjson", "msgspec", "json"] if name == "auto" else [name, "json"]
+    for candidate in candidates:
+        factory = BACKENDS.get(candidate)
+        if factory is None:
+            log.warning("Unknown JSON_CODEC '%s', falling back to json", candidate)
+            continue
+        codec = factory()
+        if codec is not None:
+            return codec
+        log.warning("JSON codec '%s' is not installed, falling back", candidate)
+    return STDLIB_CODEC
+
+
+codec = select_codec()
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON; raises ValueError on invalid input whatever the backend."""
+    try:
+        return codec.loads(data)
+    except ValueError:
+        if codec is STDLIB_CODEC:
+            raise
+        # Let the stdlib decide on anything a fast backend rejects
+        return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes."""
+    try:
+        return codec.dumps(obj)
+    except (TypeError, ValueError, OverflowError):
+        if codec is STDLIB_CODEC:
+            raise
+        # e.g. orjson refuses integers over 64 bits
+        return _stdlib_dumps(obj)
+
+
+log.info("Using JSON codec: %s", codec.name)
@@ -1,10 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 
 from .api import router as api_router
-from .api.response.response import ok, error, http_exception
+from .api.response.response import (
+    FastJSONResponse,
+    ok,
+    error,
+    http_exception,
+    service_unavailable,
+    too_many_requests,
+)
+from .cache.cache import cache
 from .logger import log
+from .quote.attestation import attestation_service
+from .quote.prewarm import prewarm_pool
+from .signing.batch import batch_signer
+from .signing.executor import signer
+from .upstream.admission import AdmissionRejected
+from .upstream.client import upstream
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await upstream.start()
+    prewarm_pool.start()
+    yield
+    await prewarm_pool.aclose()
+    await upstream.aclose()
+    await batch_signer.aclose()
+    signer.shutdown()
+    attestation_service.shutdown()
+    await cache.aclose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 app.include_router(api_router)
 
 
@@ -13,6 +43,14 @@ async def root():
     return ok()
 
 
+# Requests turned away by upstream admission control, from any route that uses the pool
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    if exc.status_code == 429:
+        return too_many_requests(str(exc), exc.retry_after)
+    return service_unavailable(str(exc), exc.retry_after)
+
+
 # Custom global error handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,169 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+# Proxy metrics are appended to the vLLM /metrics passthrough in Prometheus text format
+PREFIX = "vllm_proxy_"
+
+_lock = threading.Lock()
+_SAMPLE = re.compile(r"([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?(\s.*)")
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple[str, ...]) -> str:
+        if not key:
+            return ""
+        pairs = ",".join(f'{name}="{value}"' for name, value in zip(self.labelnames, key))
+        return "{" + pairs + "}"
+
+    @abstractmethod
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        """(sample name, label values, value) for each series."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{self._format_labels(key)} {value}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        return [(f"{self.name}_total", key, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Gauge that is set explicitly or read from a callback at render time."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels: str) -> float:
+        if self._callback is not None:
+            return self._callback()
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        if self._callback is not None:
+            return [(self.name, (), self._callback())]
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Summary(_Metric):
+    """Count and sum of observations (e.g. latencies in seconds)."""
+
+    type = "summary"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._count: dict[tuple[str, ...], int] = {}
+        self._sum: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._count[key] = self._count.get(key, 0) + 1
+            self._sum[key] = self._sum.get(key, 0.0) + value
+
+    def count(self, **labels: str) -> int:
+        return self._count.get(self._key(labels), 0)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        samples: list[tuple[str, tuple[str, ...], float]] = []
+        for key, count in self._count.items():
+            samples.append((f"{self.name}_count", key, count))
+            samples.append((f"{self.name}_sum", key, self._sum[key]))
+        return samples
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def merge_exposition(sources: list[tuple[str, str]], label: str) -> str:
+    """
+    Merge Prometheus text from several sources, adding `label="<source>"` to every sample
+    Samples of one metric family stay together under a single HELP/TYPE header, as the
+    format requires.
+    Args:
+        sources: (source, text) pairs
+        label: Name of the label that tells the sources apart
+    """
+    headers: dict[str, list[str]] = {}
+    samples: dict[str, list[str]] = {}
+    for source, text in sources:
+        value = source.replace("\\", "\\\\").replace('"', '\\"')
+        family = None
+        for line in text.splitlines():
+            if line.startswith("#"):
+                parts = line.split(None, 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    header = headers.setdefault(family, [])
+                    samples.setdefault(family, [])
+                    if not any(existing.split(None, 2)[1] == parts[1] for existing in header):
+                        header.append(line)
+                continue
+            match = _SAMPLE.match(line)
+            if match is None:
+                continue
+            name, labels, rest = match.groups()
+            if family is None or not name.startswith(family):
+                family = name
+                headers.setdefault(family, [])
+                samples.setdefault(family, [])
+            pairs = f'{label}="{value}"'
+            if labels and labels != "{}":
+                pairs += "," + labels[1:-1]
+            samples[family].append(f"{name}{{{pairs}}}{rest}")
+    lines: list[str] = []
+    for family, family_samples in samples.items():
+        lines.extend(headers[family])
+        lines.extend(family_samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from app.logger import log
+from app.metrics import Counter, Gauge, Summary
+from app.quote.quote import SigningContext, generate_attestation, parse_nonce
+
+# Seconds a nonce-less attestation report is reused, 0 disables the cache
+ATTESTATION_CACHE_TTL = float(os.getenv("ATTESTATION_CACHE_TTL", "30"))
+# Parallel quote/GPU evidence generations
+ATTESTATION_WORKERS = int(os.getenv("ATTESTATION_WORKERS", "2"))
+# Generations waiting for a worker before new requests get a 503
+ATTESTATION_MAX_QUEUE = int(os.getenv("ATTESTATION_MAX_QUEUE", "8"))
+ATTESTATION_RETRY_AFTER = int(os.getenv("ATTESTATION_RETRY_AFTER", "5"))
+
+ATTESTATION_QUEUE_TIME = Summary(
+    "attestation_queue_seconds", "Time attestation generations waited for a worker"
+)
+ATTESTATION_SERVICE_TIME = Summary(
+    "attestation_service_seconds", "Time spent generating attestation reports", ("result",)
+)
+ATTESTATION_REJECTED = Counter(
+    "attestation_rejected", "Attestation requests rejected because the queue was full"
+)
+
+
+class AttestationBusy(Exception):
+    """Raised when too many attestation generations are already queued."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Attestation service is busy")
+        self.retry_after = retry_after
+
+
+class AttestationService:
+    """
+    Serves attestation reports to the API.
+
+    - Requests with a nonce always get a freshly generated, nonce-bound report
+    - Nonce-less requests share a cached report per signing algorithm for the TTL
+    - Concurrent nonce-less misses are coalesced into a single generation
+    - Generation runs in a worker pool, off the event loop, with a bounded queue;
+      malformed nonces are rejected before they queue
+    """
+
+    def __init__(
+        self,
+        cache_ttl: float = ATTESTATION_CACHE_TTL,
+        generate: Callable[..., dict] = generate_attestation,
+        workers: int = ATTESTATION_WORKERS,
+        max_queue: int = ATTESTATION_MAX_QUEUE,
+        retry_after: int = ATTESTATION_RETRY_AFTER,
+    ) -> None:
+        self.cache_ttl = cache_ttl
+        self._generate_attestation = generate
+        self._cached: dict[str, tuple[float, dict]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(workers)
+        self._waiting = 0
+
+    @property
+    def waiting(self) -> int:
+        """Generations waiting for a worker."""
+        return self._waiting
+
+    async def report(self, context: SigningContext, nonce: Optional[str] = None) -> dict:
+        """
+        Get an attestation report for the signing context
+        Raises:
+            ValueError: The nonce is malformed, checked before it takes a queue slot
+            AttestationBusy: Too many generations are queued
+        """
+        if nonce is not None:
+            parse_nonce(nonce)
+            return await self._generate(context, nonce)
+        if self.cache_ttl <= 0:
+            return await self._generate(context, None)
+
+        cached = self._cached.get(context.method)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        task = self._inflight.get(context.method)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(context))
+            self._inflight[context.method] = task
+            task.add_done_callback(lambda _: self._inflight.pop(context.method, None))
+        # Shielded so a cancelled caller does not cancel the generation others wait on
+        return await asyncio.shield(task)
+
+    async def _refresh(self, context: SigningContext) -> dict:
+        report = await self._generate(context, None)
+        self._cached[context.method] = (time.monotonic() + self.cache_ttl, report)
+        log.info("Cached nonce-less attestation for %s", context.method)
+        return report
+
+    async def _generate(self, context: SigningContext, nonce: Optional[str]) -> dict:
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            ATTESTATION_REJECTED.inc()
+            raise AttestationBusy(self.retry_after)
+
+        queued = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        started = time.perf_counter()
+        ATTESTATION_QUEUE_TIME.observe(started - queued)
+        result = "error"
+        try:
+            loop = asyncio.get_running_loop()
+            report = await loop.run_in_executor(
+                self._get_executor(), self._generate_attestation, context, nonce
+            )
+            result = "ok"
+            return report
+        finally:
+            ATTESTATION_SERVICE_TIME.observe(time.perf_counter() - started, result=result)
+            self._slots.release()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="attestation"
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker pool once running generations finish."""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=True)
+
+    def invalidate(self) -> None:
+        """Drop cached nonce-less reports."""
+        self._cached.clear()
+
+
+attestation_service = AttestationService()
+
+Gauge(
+    "attestation_queue_depth",
+    "Attestation generations waiting for a worker",
+    callback=lambda: attestation_service.waiting,
+)
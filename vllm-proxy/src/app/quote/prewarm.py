@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from app.logger import log
+from app.metrics import Counter
+from app.quote.attestation import AttestationBusy, AttestationService, attestation_service
+from app.quote.quote import SigningContext, ecdsa_context, ed25519_context
+
+# Reports kept ready per signing algorithm for server-issued nonces, 0 disables issuing
+ATTESTATION_PREWARM_POOL = int(os.getenv("ATTESTATION_PREWARM_POOL", "0"))
+# Seconds a pre-generated report and its issued nonce stay valid
+ATTESTATION_NONCE_TTL = float(os.getenv("ATTESTATION_NONCE_TTL", "300"))
+
+PREWARM_NONCES = Counter(
+    "attestation_prewarm_nonces",
+    "Issued nonces by whether their report was already generated",
+    ("result",),
+)
+
+
+class PrewarmPool:
+    """
+    Pre-generates attestation reports for nonces the server issues itself.
+
+    - issue() hands out the nonce of an already generated report when one is ready,
+      otherwise a fresh nonce whose report starts generating immediately
+    - A background task keeps `size` ready reports per signing algorithm
+    - redeem() returns the report for an issued nonce once, until the TTL passes
+    """
+
+    def __init__(
+        self,
+        size: int = ATTESTATION_PREWARM_POOL,
+        nonce_ttl: float = ATTESTATION_NONCE_TTL,
+        service: AttestationService = attestation_service,
+        contexts: Iterable[SigningContext] = (ecdsa_context, ed25519_context),
+    ) -> None:
+        self.size = size
+        self.nonce_ttl = nonce_ttl
+        self._service = service
+        self._contexts = {context.method: context for context in contexts}
+        # Ready reports per algorithm, oldest first: (generated_at, nonce, report)
+        self._ready: dict[str, deque[tuple[float, str, dict]]] = {
+            method: deque() for method in self._contexts
+        }
+        # Issued nonce -> (expires_at, algorithm, report future)
+        self._issued: dict[str, tuple[float, str, asyncio.Future]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self) -> None:
+        """Start the refill task if pre-warming is enabled."""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._refill_forever())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def issue(self, context: SigningContext) -> str:
+        """Issue a nonce for a later /attestation/report?nonce= request."""
+        if not self.enabled:
+            raise RuntimeError("Nonce issuing is not enabled")
+        self.start()
+        now = time.monotonic()
+        self._purge(now)
+
+        ready = self._ready[context.method]
+        if ready:
+            _, nonce, report = ready.popleft()
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(report)
+            PREWARM_NONCES.inc(result="ready")
+        else:
+            nonce = os.urandom(32).hex()
+            future = asyncio.ensure_future(self._service.report(context, nonce))
+            # Retrieve failures here so an unredeemed nonce does not log "never retrieved"
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            PREWARM_NONCES.inc(result="pending")
+
+        self._issued[nonce] = (now + self.nonce_ttl, context.method, future)
+        self._wakeup.set()
+        return nonce
+
+    async def redeem(self, context: SigningContext, nonce: str) -> Optional[dict]:
+        """Get the report for an issued nonce, or None if it was not issued here."""
+        entry = self._issued.get(nonce.lower())
+        if entry is None:
+            return None
+        expires_at, method, future = entry
+        if method != context.method or expires_at <= time.monotonic():
+            return None
+        del self._issued[nonce.lower()]
+        return await asyncio.shield(future)
+
+    def _purge(self, now: float) -> None:
+        for nonce in [nonce for nonce, entry in self._issued.items() if entry[0] <= now]:
+            del self._issued[nonce]
+        for ready in self._ready.values():
+            while ready and ready[0][0] + self.nonce_ttl <= now:
+                ready.popleft()
+
+    async def _refill_forever(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self._refill()
+            except AttestationBusy as exc:
+                await asyncio.sleep(exc.retry_after)
+                continue
+            except Exception as exc:
+                log.error("Attestation pre-warm failed: %s", exc)
+                await asyncio.sleep(5)
+                continue
+            # Wake on the next issue, or in time to replace reports about to expire.
+            # asyncio.wait rather than wait_for, which can swallow a concurrent cancel.
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=self.nonce_ttl / 2)
+            finally:
+                waiter.cancel()
+
+    async def _refill(self) -> None:
+        for method, context in self._contexts.items():
+            self._purge(time.monotonic())
+            ready = self._ready[method]
+            while len(ready) < self.size:
+                nonce = os.urandom(32).hex()
+                report = await self._service.report(context, nonce)
+                ready.append((time.monotonic(), nonce, report))
+
+
+prewarm_pool = PrewarmPool()
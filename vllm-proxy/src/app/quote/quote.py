@@ -1,8 +1,12 @@
+import base64
 import json
 import os
 import hashlib
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Callable
+from typing import Any, Optional, Callable
 
 import eth_utils
 import pynvml
@@ -11,14 +15,86 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 from dstack_sdk import DstackClient
 from eth_account.messages import encode_defunct
-from nv_attestation_sdk import attestation
 from verifier import cc_admin
+from verifier.config import GPU_ARCHITECTURE_MAP, BaseSettings
+from verifier.nvml import NvmlHandler
+from verifier.nvml.gpu_cert_chains import GpuCertificateChains
 from app.logger import log
 
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
 ED25519 = "ed25519"
 ECDSA = "ecdsa"
 GPU_ARCH = "HOPPER"
 NO_GPU_MODE = os.getenv("GPU_NO_HW_MODE", "0").lower() in {"1", "true", "yes"}
+# Threads reading GPU evidence in parallel, 0 means one per GPU
+GPU_EVIDENCE_WORKERS = int(os.getenv("GPU_EVIDENCE_WORKERS", "0"))
+# auto | coincurve | eth_account
+SIGNING_BACKEND = os.getenv("SIGNING_BACKEND", "auto").lower()
+
+EIP191_PREFIX = b"\x19Ethereum Signed Message:\n"
+
+
+class SigningBackend(ABC):
+    """Signs text content with a key held for the lifetime of the process."""
+
+    name = "base"
+
+    @abstractmethod
+    def sign(self, content: str) -> str:
+        """Signature over `content`, hex-encoded."""
+
+
+class Ed25519Backend(SigningBackend):
+    name = "cryptography"
+
+    def __init__(self, private_key: Ed25519PrivateKey) -> None:
+        self._private_key = private_key
+
+    def sign(self, content: str) -> str:
+        return self._private_key.sign(content.encode("utf-8")).hex()
+
+
+class EthAccountBackend(SigningBackend):
+    """EIP-191 personal_sign through eth_account's generic message path."""
+
+    name = "eth_account"
+
+    def __init__(self, account: web3.Account) -> None:
+        self._account = account
+
+    def sign(self, content: str) -> str:
+        signed_message = self._account.sign_message(encode_defunct(text=content))
+        return f"0x{signed_message.signature.hex()}"
+
+
+class CoincurveBackend(SigningBackend):
+    """
+    EIP-191 personal_sign with libsecp256k1 through coincurve.
+    Produces the same r || s || v signatures as eth_account (RFC 6979 nonces, v in {27, 28}).
+    """
+
+    name = "coincurve"
+
+    def __init__(self, private_key: bytes) -> None:
+        self._private_key = coincurve.PrivateKey(private_key)
+
+    def sign(self, content: str) -> str:
+        message = content.encode("utf-8")
+        digest = eth_utils.keccak(EIP191_PREFIX + str(len(message)).encode() + message)
+        signature = self._private_key.sign_recoverable(digest, hasher=None)
+        return f"0x{signature[:64].hex()}{signature[64] + 27:02x}"
+
+
+def _ecdsa_backend(account: web3.Account, backend: str = SIGNING_BACKEND) -> SigningBackend:
+    if backend in {"auto", "coincurve"} and coincurve is not None:
+        return CoincurveBackend(bytes(account.key))
+    if backend == "coincurve":
+        log.warning("SIGNING_BACKEND=coincurve but coincurve is not installed, using eth_account")
+    return EthAccountBackend(account)
 
 
 @dataclass
@@ -28,15 +104,20 @@ class SigningContext:
     signing_address_bytes: bytes
     _ed_private: Optional[Ed25519PrivateKey] = None
     _raw_account: Optional[web3.Account] = None
+    _backend: Optional[SigningBackend] = None
 
-    def sign(self, content: str) -> str:
+    def __post_init__(self) -> None:
+        if self._backend is not None:
+            return
         if self.method == ED25519 and self._ed_private:
-            signature = self._ed_private.sign(content.encode("utf-8"))
-            return signature.hex()
-        if self.method == ECDSA and self._raw_account:
-            signed_message = self._raw_account.sign_message(encode_defunct(text=content))
-            return f"0x{signed_message.signature.hex()}"
-        raise ValueError("Signing context is not properly initialised")
+            self._backend = Ed25519Backend(self._ed_private)
+        elif self.method == ECDSA and self._raw_account:
+            self._backend = _ecdsa_backend(self._raw_account)
+
+    def sign(self, content: str) -> str:
+        if self._backend is None:
+            raise ValueError("Signing context is not properly initialised")
+        return self._backend.sign(content)
 
 
 def _build_report_data(signing_address_bytes: bytes, nonce: bytes) -> bytes:
@@ -50,7 +131,8 @@ def _build_report_data(signing_address_bytes: bytes, nonce: bytes) -> bytes:
     return signing_address_bytes.ljust(32, b"\x00") + nonce
 
 
-def _parse_nonce(nonce: Optional[bytes | str]) -> bytes:
+def parse_nonce(nonce: Optional[bytes | str]) -> bytes:
+    """Decode a request nonce (32 bytes, hex in a string), a random one when absent."""
     if nonce is None:
         return os.urandom(32)
     if isinstance(nonce, bytes):
@@ -65,39 +147,192 @@ def _parse_nonce(nonce: Optional[bytes | str]) -> bytes:
     return nonce_bytes
 
 
+class GpuEvidenceCollector:
+    """
+    Collects GPU evidence for the remote verifier.
+
+    - NVML is initialised on first use and kept for the process lifetime
+    - Each GPU's attestation report is fetched concurrently
+    - Evidence is returned in device index order, in the format of
+      cc_admin.collect_gpu_evidence_remote
+    A failed collection shuts NVML down so the next one starts clean; the teardown
+    waits for concurrent collections to finish, and new ones wait for the teardown.
+    """
+
+    def __init__(self, max_workers: int = GPU_EVIDENCE_WORKERS) -> None:
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._device_count: Optional[int] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Collections using NVML, and whether it must be torn down once they finish
+        self._active = 0
+        self._stale = False
+        self._closing = False
+
+    def _init_nvml(self) -> None:
+        """Initialise NVML and the worker threads; called with the lock held."""
+        cc_admin.init_nvml(ppcie_mode=False)
+        try:
+            # Also caches the device handles NvmlHandler reads from
+            device_count = NvmlHandler.get_number_of_gpus()
+            if device_count == 0:
+                raise Exception("No GPU found")
+            if device_count == 1 and NvmlHandler.is_ppcie_mode_enabled():
+                raise Exception("Attestation in standalone mode is not supported for PPCIE system")
+        except Exception:
+            _nvml_shutdown()
+            raise
+        workers = self.max_workers or device_count
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gpu-evidence")
+        self._device_count = device_count
+        log.info("NVML initialised with %d GPUs", device_count)
+
+    def _acquire(self) -> tuple[int, ThreadPoolExecutor]:
+        with self._cond:
+            self._cond.wait_for(lambda: not self._closing)
+            if self._device_count is None:
+                self._init_nvml()
+            self._active += 1
+            return self._device_count, self._executor
+
+    def _release(self, failed: bool) -> None:
+        with self._cond:
+            self._active -= 1
+            self._stale = self._stale or failed
+            if not self._stale or self._active:
+                return
+            executor, self._executor = self._executor, None
+            self._device_count = None
+            self._stale = False
+            self._closing = True
+        try:
+            executor.shutdown(wait=True)
+            _nvml_shutdown()
+        finally:
+            with self._cond:
+                self._closing = False
+                self._cond.notify_all()
+
+    def _device_evidence(self, index: int, nonce: bytes) -> dict:
+        gpu = NvmlHandler(index=index, nonce=nonce, settings=BaseSettings)
+        settings = GPU_ARCHITECTURE_MAP.get(gpu.get_gpu_architecture())
+        if settings is None:
+            raise Exception(f"Unknown GPU architecture for GPU {index}")
+        cert_chain = gpu.get_attestation_cert_chain()
+        return {
+            "certificate": GpuCertificateChains.extract_gpu_cert_chain_base64(cert_chain),
+            "evidence": base64.b64encode(gpu.get_attestation_report()).decode("utf-8"),
+            "arch": settings.GPU_ARCH_NAME,
+        }
+
+    def collect(self, nonce_hex: str) -> list:
+        nonce = bytes.fromhex(nonce_hex)
+        device_count, executor = self._acquire()
+        failed = True
+        try:
+            if device_count == 1:
+                evidence = [self._device_evidence(0, nonce)]
+            else:
+                futures = [
+                    executor.submit(self._device_evidence, index, nonce)
+                    for index in range(device_count)
+                ]
+                evidence = [future.result() for future in futures]
+            failed = False
+            return evidence
+        finally:
+            self._release(failed)
+
+    def shutdown(self) -> None:
+        """
+        Release NVML and the worker threads once no collection is using them;
+        the next collect() re-initialises.
+        """
+        with self._cond:
+            if self._device_count is None:
+                return
+            # Tear down through the same path as a failed collection
+            self._active += 1
+        self._release(failed=True)
+
+
+def _nvml_shutdown() -> None:
+    try:
+        pynvml.nvmlShutdown()
+    except pynvml.NVMLError:
+        pass
+
+
+gpu_evidence_collector = GpuEvidenceCollector()
+
+
 def _collect_gpu_evidence(nonce_hex: str, no_gpu_mode: bool) -> list:
     if no_gpu_mode:
         log.info("GPU evidence no-GPU mode enabled; using canned evidence")
         return cc_admin.collect_gpu_evidence_remote(nonce_hex, no_gpu_mode=True)
 
     try:
-        pynvml.nvmlInit()
-        device_count = pynvml.nvmlDeviceGetCount()
-        if device_count == 1:
-            return cc_admin.collect_gpu_evidence_remote(nonce_hex)
-        attester = attestation.Attestation()
-        attester.set_name("HOPPER")
-        attester.set_nonce(nonce_hex)
-        attester.set_claims_version("2.0")
-        attester.set_ocsp_nonce_disabled(True)
-        attester.add_verifier(
-            dev=attestation.Devices.GPU,
-            env=attestation.Environment["REMOTE"],
-            url=None,
-            evidence="",
-        )
-        return attester.get_evidence(options={"ppcie_mode": False})
+        return gpu_evidence_collector.collect(nonce_hex)
     except pynvml.NVMLError as error:
         log.error("NVML error while collecting GPU evidence: %s", error)
         raise Exception("NVML error during GPU evidence collection") from error
     except Exception as error:
         log.error("GPU evidence collection failed: %s", error)
         raise
-    finally:
-        try:
-            pynvml.nvmlShutdown()
-        except pynvml.NVMLError:
-            pass
+
+
+class BootState:
+    """
+    Attestation inputs that are fixed for the life of the CVM.
+
+    - One DstackClient is reused for every quote
+    - client.info() is fetched once
+    - The parsed event log is reused while the raw event log is unchanged
+    Nothing expires on its own; call invalidate() to refetch.
+    """
+
+    def __init__(self, client_factory: Callable[[], DstackClient] = DstackClient) -> None:
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        self._client: Optional[DstackClient] = None
+        self._info: Optional[dict] = None
+        self._event_log_raw: Optional[str] = None
+        self._event_log: Any = None
+
+    @property
+    def client(self) -> DstackClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def info(self) -> dict:
+        if self._info is None:
+            info = self.client.info().model_dump()
+            with self._lock:
+                if self._info is None:
+                    self._info = info
+        return self._info
+
+    def event_log(self, raw: str) -> Any:
+        cached_raw, cached = self._event_log_raw, self._event_log
+        if raw == cached_raw:
+            return cached
+        parsed = json.loads(raw)
+        with self._lock:
+            self._event_log_raw, self._event_log = raw, parsed
+        return parsed
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._client = None
+            self._info = None
+            self._event_log_raw = None
+            self._event_log = None
+
+
+boot_state = BootState()
 
 
 def _build_nvidia_payload(nonce_hex: str, evidences: list) -> str:
@@ -136,6 +371,7 @@ def _create_ecdsa_context() -> SigningContext:
 
 ecdsa_context = _create_ecdsa_context()
 ed25519_context = _create_ed25519_context()
+log.info("ECDSA signing backend: %s", ecdsa_context._backend.name)
 
 
 def sign_message(context: SigningContext, content: str) -> str:
@@ -145,15 +381,14 @@ def sign_message(context: SigningContext, content: str) -> str:
 def generate_attestation(
     context: SigningContext, nonce: Optional[bytes | str] = None
 ) -> dict:
-    request_nonce_bytes = _parse_nonce(nonce)
+    request_nonce_bytes = parse_nonce(nonce)
     request_nonce_hex = request_nonce_bytes.hex()
 
     # Build TDX report data: signing_address || request_nonce
     report_data = _build_report_data(context.signing_address_bytes, request_nonce_bytes)
 
-    client = DstackClient()
-    quote_result = client.get_quote(report_data)
-    event_log = json.loads(quote_result.event_log)
+    quote_result = boot_state.client.get_quote(report_data)
+    event_log = boot_state.event_log(quote_result.event_log)
 
     # Use request_nonce directly for GPU attestation
     gpu_evidence = _collect_gpu_evidence(request_nonce_hex, NO_GPU_MODE)
@@ -161,7 +396,7 @@ def generate_attestation(
         raise Exception("No GPU evidence found")
     nvidia_payload = _build_nvidia_payload(request_nonce_hex, gpu_evidence)
 
-    info = client.info().model_dump()
+    info = boot_state.info()
 
     return dict(
         signing_address=context.signing_address,
@@ -176,6 +411,10 @@ def generate_attestation(
 
 __all__ = [
     "SigningContext",
+    "SigningBackend",
+    "BootState",
+    "GpuEvidenceCollector",
+    "boot_state",
     "sign_message",
     "generate_attestation",
     "ecdsa_context",
@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+from app.batching import MicroBatcher
+from app.logger import log
+from app.metrics import Summary
+from app.signing.chat import sign_batch
+from app.signing.executor import SigningExecutor, signer
+
+# Completions share one root signature per batch of up to BATCH_SIGNING_MAX_ITEMS, over at most the window
+BATCH_SIGNING_WINDOW_MS = float(os.getenv("BATCH_SIGNING_WINDOW_MS", "20"))
+BATCH_SIGNING_MAX_ITEMS = int(os.getenv("BATCH_SIGNING_MAX_ITEMS", "256"))
+
+BATCH_SIZE = Summary("signing_batch_size", "Completions covered by one Merkle root signature")
+
+
+class BatchSigner:
+    """
+    Collects completion hashes and signs a Merkle root per batch.
+
+    Each caller gets back its own record: the root signatures plus the
+    inclusion proof of its text.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = BATCH_SIGNING_WINDOW_MS,
+        max_items: int = BATCH_SIGNING_MAX_ITEMS,
+        executor: SigningExecutor = signer,
+    ) -> None:
+        self._executor = executor
+        self._batcher: MicroBatcher[tuple[str, asyncio.Future]] = MicroBatcher(
+            self._sign_batch, window_ms, max_items
+        )
+
+    async def sign(self, text: str) -> dict:
+        """Add text to the current batch and wait for its signed record."""
+        future = asyncio.get_running_loop().create_future()
+        self._batcher.add((text, future))
+        return await future
+
+    async def _sign_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        BATCH_SIZE.observe(len(batch))
+        try:
+            records = await self._executor.run(sign_batch, [text for text, _ in batch])
+        except Exception as exc:
+            log.error("Batch signing of %d completions failed: %s", len(batch), exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), record in zip(batch, records):
+            # The waiting request may have been cancelled meanwhile
+            if not future.done():
+                future.set_result(record)
+
+    async def aclose(self) -> None:
+        """Sign whatever is pending and wait for in-flight batches."""
+        await self._batcher.aclose()
+
+
+batch_signer = BatchSigner()
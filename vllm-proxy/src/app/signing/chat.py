@@ -0,0 +1,89 @@
+import hmac
+import os
+from hashlib import sha256
+
+from app.quote.quote import (
+    ECDSA,
+    SigningContext,
+    ecdsa_context,
+    ed25519_context,
+    sign_message,
+)
+from app.signing.merkle import build_tree
+
+EAGER = "eager"
+LAZY = "lazy"
+BATCH = "batch"
+# eager: sign every completion when it finishes
+# lazy: store the hashes only, sign on the first GET /signature/{chat_id}
+# batch: sign one Merkle root per batch of completions, store each inclusion proof
+SIGNING_MODE = os.getenv("SIGNING_MODE", EAGER).lower()
+
+# Lazy records are sealed with a per-process key, so this replica only ever signs
+# hashes it computed itself; anything else written to the cache is refused.
+_SEAL_KEY = os.urandom(32)
+# A record sealed by another process can never be signed, so lazy signing needs
+# the chat cache to be private to this single process
+if SIGNING_MODE == LAZY and (
+    os.getenv("REDIS_HOST") or int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+):
+    raise ValueError(
+        "SIGNING_MODE=lazy requires a single worker without a shared Redis cache; "
+        "use eager or batch signing"
+    )
+
+
+def signing_context(signing_algo: str) -> SigningContext:
+    return ecdsa_context if signing_algo == ECDSA else ed25519_context
+
+
+def sign_chat(text: str) -> dict:
+    return dict(
+        text=text,
+        signature_ecdsa=sign_message(ecdsa_context, text),
+        signing_address_ecdsa=ecdsa_context.signing_address,
+        signature_ed25519=sign_message(ed25519_context, text),
+        signing_address_ed25519=ed25519_context.signing_address,
+    )
+
+
+def _seal(text: str) -> str:
+    return hmac.new(_SEAL_KEY, text.encode("utf-8"), sha256).hexdigest()
+
+
+def seal_chat(text: str) -> dict:
+    """Build an unsigned record for lazy signing."""
+    return dict(text=text, seal=_seal(text))
+
+
+def is_signable(record: dict) -> bool:
+    """Whether this replica sealed the record and may sign it."""
+    text, seal = record.get("text"), record.get("seal")
+    if not isinstance(text, str) or not isinstance(seal, str):
+        return False
+    return hmac.compare_digest(seal, _seal(text))
+
+
+def sign_record(record: dict, signing_algo: str) -> dict:
+    """Add the signature for one algorithm to a lazy record."""
+    context = signing_context(signing_algo)
+    signed = dict(record)
+    signed[f"signature_{signing_algo}"] = sign_message(context, record["text"])
+    signed[f"signing_address_{signing_algo}"] = context.signing_address
+    return signed
+
+
+def sign_batch(texts: list[str]) -> list[dict]:
+    """
+    Sign a batch of texts with a single signature per algorithm over their Merkle root
+    Returns:
+        One record per text holding the root signatures and the text's inclusion proof
+    """
+    root, proofs = build_tree(texts)
+    signatures = sign_chat(root)
+    records = []
+    for text, proof in zip(texts, proofs):
+        record = dict(signatures)
+        record.update(text=text, merkle_root=root, merkle_proof=proof)
+        records.append(record)
+    return records
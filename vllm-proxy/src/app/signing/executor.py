@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.logger import log
+from app.metrics import Counter, Gauge, Summary
+
+SIGNING_WORKERS = int(os.getenv("SIGNING_WORKERS", "2"))
+# Signing jobs queued or running in the pool; further callers wait for a slot
+SIGNING_MAX_PENDING = int(os.getenv("SIGNING_MAX_PENDING", "256"))
+
+SIGNING_JOBS = Counter("signing_jobs", "Signing jobs completed", ("result",))
+SIGNING_SATURATED = Counter(
+    "signing_saturated", "Signing jobs that waited because the queue was full"
+)
+SIGNING_WAIT = Summary("signing_wait_seconds", "Time signing jobs spent queued")
+SIGNING_DURATION = Summary("signing_duration_seconds", "Time spent signing in the pool")
+
+
+class SigningExecutor:
+    """
+    Runs signing off the event loop in a bounded worker thread pool.
+
+    Signing keys never leave the process: workers call the signing contexts
+    from app.quote.quote directly.
+    """
+
+    def __init__(self, max_workers: int = SIGNING_WORKERS, max_pending: int = SIGNING_MAX_PENDING) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Jobs waiting for a slot, queued or running."""
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="signing"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a signing function in the pool and await its result."""
+        submitted = time.perf_counter()
+        self._pending += 1
+        try:
+            if self._slots.locked():
+                SIGNING_SATURATED.inc()
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._get_executor(), _timed, fn, args, submitted
+                )
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Finish queued jobs and stop the workers."""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=True)
+            log.info("Signing executor stopped")
+
+
+def _timed(fn: Callable[..., Any], args: tuple, submitted: float) -> Any:
+    started = time.perf_counter()
+    SIGNING_WAIT.observe(started - submitted)
+    try:
+        result = fn(*args)
+    except Exception:
+        SIGNING_JOBS.inc(result="error")
+        raise
+    finally:
+        SIGNING_DURATION.observe(time.perf_counter() - started)
+    SIGNING_JOBS.inc(result="ok")
+    return result
+
+
+signer = SigningExecutor()
+
+Gauge(
+    "signing_queue_depth",
+    "Signing jobs waiting, queued or running",
+    callback=lambda: signer.pending,
+)
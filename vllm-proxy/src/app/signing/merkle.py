@@ -0,0 +1,65 @@
+from hashlib import sha256
+
+# Domain separation between leaves and inner nodes (second-preimage resistance)
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+LEFT = "left"
+RIGHT = "right"
+
+
+def leaf_hash(text: str) -> bytes:
+    return sha256(LEAF_PREFIX + text.encode("utf-8")).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_tree(texts: list[str]) -> tuple[str, list[list[dict]]]:
+    """
+    Build a Merkle tree over the texts
+    Returns:
+        The hex root and, for each text, its inclusion proof: the sibling hashes
+        from leaf to root with the side each sibling sits on. An unpaired node is
+        promoted to the next level unchanged and adds no proof step.
+    """
+    if not texts:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    level = [leaf_hash(text) for text in texts]
+    # Index of each leaf's ancestor in the current level
+    positions = list(range(len(texts)))
+    proofs: list[list[dict]] = [[] for _ in texts]
+
+    while len(level) > 1:
+        for leaf, index in enumerate(positions):
+            sibling = index ^ 1
+            if sibling < len(level):
+                side = LEFT if sibling < index else RIGHT
+                proofs[leaf].append({"position": side, "hash": level[sibling].hex()})
+        next_level = [
+            node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        positions = [index // 2 for index in positions]
+        level = next_level
+
+    return level[0].hex(), proofs
+
+
+def compute_root(text: str, proof: list[dict]) -> str:
+    """Fold an inclusion proof from the leaf for text up to the root."""
+    node = leaf_hash(text)
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        if step["position"] == LEFT:
+            node = node_hash(sibling, node)
+        elif step["position"] == RIGHT:
+            node = node_hash(node, sibling)
+        else:
+            raise ValueError(f"Invalid proof position: {step['position']}")
+    return node.hex()
+
+
+def verify_proof(text: str, proof: list[dict], root: str) -> bool:
+    return compute_root(text, proof) == root.lower()
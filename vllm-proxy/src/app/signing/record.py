@@ -0,0 +1,130 @@
+import os
+import re
+from hashlib import sha256
+from typing import Optional
+
+from app.codec import dumps, loads
+
+JSON = "json"
+COMPACT = "compact"
+# json: cache records as JSON text
+# compact: cache fully signed records as raw bytes (JSON for anything else)
+CACHE_RECORD_FORMAT = os.getenv("CACHE_RECORD_FORMAT", JSON).lower()
+
+# 0x00 never starts JSON; the second byte is the layout version
+COMPACT_MAGIC = b"\x00\x01"
+KEY_ID_SIZE = 4
+HASH_SIZE = 32
+ECDSA_SIGNATURE_SIZE = 65
+ED25519_SIGNATURE_SIZE = 64
+COMPACT_SIZE = len(COMPACT_MAGIC) + KEY_ID_SIZE + 2 * HASH_SIZE + ECDSA_SIGNATURE_SIZE + ED25519_SIGNATURE_SIZE
+
+SIGNED_FIELDS = {
+    "text",
+    "signature_ecdsa",
+    "signing_address_ecdsa",
+    "signature_ed25519",
+    "signing_address_ed25519",
+}
+_TEXT = re.compile(r"[0-9a-f]{64}:[0-9a-f]{64}")
+_ECDSA_SIGNATURE = re.compile(r"0x[0-9a-f]{130}")
+_ED25519_SIGNATURE = re.compile(r"[0-9a-f]{128}")
+
+
+def signer_key_id(ecdsa_address: str, ed25519_address: str) -> str:
+    """Short id of a pair of signing addresses, stored in compact records instead of the addresses."""
+    digest = sha256(f"{ecdsa_address}:{ed25519_address}".encode("utf-8")).digest()
+    return digest[:KEY_ID_SIZE].hex()
+
+
+def signer_entry(record: dict) -> str:
+    """Registry value for the signing addresses of a record."""
+    return dumps(
+        dict(
+            signing_address_ecdsa=record["signing_address_ecdsa"],
+            signing_address_ed25519=record["signing_address_ed25519"],
+        )
+    ).decode()
+
+
+def pack_record(record: dict) -> Optional[tuple[str, bytes]]:
+    """
+    Pack an eagerly signed record of two lowercase hex hashes
+    Returns:
+        The signer key id and the packed bytes, or None if the record does not fit the layout
+        (custom request hashes, lazy or batch records)
+    """
+    if set(record) != SIGNED_FIELDS:
+        return None
+    text, ecdsa, ed25519 = record["text"], record["signature_ecdsa"], record["signature_ed25519"]
+    if not (
+        _TEXT.fullmatch(text)
+        and _ECDSA_SIGNATURE.fullmatch(ecdsa)
+        and _ED25519_SIGNATURE.fullmatch(ed25519)
+    ):
+        return None
+    key_id = signer_key_id(record["signing_address_ecdsa"], record["signing_address_ed25519"])
+    packed = (
+        COMPACT_MAGIC
+        + bytes.fromhex(key_id)
+        + bytes.fromhex(text[:64])
+        + bytes.fromhex(text[65:])
+        + bytes.fromhex(ecdsa[2:])
+        + bytes.fromhex(ed25519)
+    )
+    return key_id, packed
+
+
+def compact_key_id(value: str | bytes) -> Optional[str]:
+    """Signer key id of a compact record, None for JSON records."""
+    if isinstance(value, bytes) and value.startswith(COMPACT_MAGIC):
+        return value[len(COMPACT_MAGIC):len(COMPACT_MAGIC) + KEY_ID_SIZE].hex()
+    return None
+
+
+def unpack_record(value: bytes) -> tuple[str, dict]:
+    """
+    Unpack a compact record
+    Returns:
+        The signer key id and the record without its signing addresses
+    """
+    if len(value) != COMPACT_SIZE or not value.startswith(COMPACT_MAGIC):
+        raise ValueError("Invalid compact record")
+    view = memoryview(value)[len(COMPACT_MAGIC):]
+    fields = []
+    for size in (KEY_ID_SIZE, HASH_SIZE, HASH_SIZE, ECDSA_SIGNATURE_SIZE, ED25519_SIGNATURE_SIZE):
+        fields.append(view[:size].hex())
+        view = view[size:]
+    key_id, request_hash, response_hash, ecdsa, ed25519 = fields
+    return key_id, dict(
+        text=f"{request_hash}:{response_hash}",
+        signature_ecdsa=f"0x{ecdsa}",
+        signature_ed25519=ed25519,
+    )
+
+
+def encode_record(record: dict, record_format: str = CACHE_RECORD_FORMAT) -> tuple[Optional[str], str | bytes]:
+    """
+    Serialize a record for the cache
+    Returns:
+        The signer key id the value refers to (None for JSON) and the value
+    """
+    if record_format == COMPACT:
+        packed = pack_record(record)
+        if packed is not None:
+            return packed
+    return None, dumps(record).decode()
+
+
+def decode_record(value: str | bytes, signer: Optional[dict] = None) -> dict:
+    """Parse a cached record; compact records need the addresses of their signer."""
+    if compact_key_id(value) is None:
+        return loads(value)
+    _, record = unpack_record(value)
+    if signer is None:
+        raise ValueError("Unknown signer for compact record")
+    record.update(
+        signing_address_ecdsa=signer["signing_address_ecdsa"],
+        signing_address_ed25519=signer["signing_address_ed25519"],
+    )
+    return record
@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import itertools
+import os
+from typing import NamedTuple, Optional
+
+from app.metrics import Counter, Summary
+
+# Requests waiting for upstream capacity before new ones are turned away with 429
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+# Seconds a request may wait for upstream capacity before it is turned away with 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+# Retry-After sent with rejected requests
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Request header naming the tenant a request is queued for; without it requests share one tenant
+ADMISSION_TENANT_HEADER = os.getenv("ADMISSION_TENANT_HEADER", "X-Tenant-Id")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Share of queued capacity each tenant's streaming (interactive) and non-streaming (batch) lane gets
+ADMISSION_WEIGHTS = {
+    INTERACTIVE: float(os.getenv("ADMISSION_INTERACTIVE_WEIGHT", "8")),
+    BATCH: float(os.getenv("ADMISSION_BATCH_WEIGHT", "1")),
+}
+
+ADMISSION_WAIT_SECONDS = Summary(
+    "admission_wait_seconds",
+    "Time requests waited in the admission queue for upstream capacity",
+    ("lane",),
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected",
+    "Requests turned away by admission control (full: queue full, timeout: deadline passed)",
+    ("reason",),
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted to the upstream pool."""
+
+    def __init__(self, status_code: int, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Lane(NamedTuple):
+    """Who a request is queued for: its tenant and its class (INTERACTIVE or BATCH)."""
+
+    tenant: str = ""
+    kind: str = INTERACTIVE
+
+
+DEFAULT_LANE = Lane()
+
+
+class Ticket(NamedTuple):
+    """A request's place in the queue, kept when it has to wait again."""
+
+    finish: float
+    seq: int
+    deadline: float
+
+
+class AdmissionQueue:
+    """
+    Bounded weighted fair queue of requests waiting for upstream capacity.
+
+    - Each (tenant, class) lane gets capacity in proportion to its class weight,
+      so one tenant's batch backlog delays interactive streams only by its share
+      and tenants share equally; within a lane requests stay in order
+    - A request arriving at a full queue is rejected at once (429), one still
+      waiting at its deadline is rejected with 503
+    - Freed capacity is granted to the first request in fair order; until it is
+      taken, new requests queue rather than overtaking
+    """
+
+    def __init__(
+        self,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+        weights: dict[str, float] = ADMISSION_WEIGHTS,
+    ) -> None:
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.weights = weights
+        # Waiters ordered by virtual finish time; cancelled ones are skipped on wake
+        self._heap: list[tuple[float, int, asyncio.Future]] = []
+        self._waiting = 0
+        self._granted = 0
+        self._virtual = 0.0
+        self._finish: dict[Lane, float] = {}
+        self._seq = itertools.count()
+
+    @property
+    def depth(self) -> int:
+        """Requests waiting for capacity."""
+        return self._waiting
+
+    @property
+    def busy(self) -> bool:
+        """Requests are waiting or hold a grant they have not used yet."""
+        return self._waiting > 0 or self._granted > 0
+
+    def _enqueue(self, lane: Lane, deadline: float) -> Ticket:
+        """Stamp a new request with its lane's next virtual finish time."""
+        start = max(self._virtual, self._finish.get(lane, 0.0))
+        finish = start + 1 / self.weights.get(lane.kind, 1.0)
+        self._finish[lane] = finish
+        return Ticket(finish, next(self._seq), deadline)
+
+    async def wait(self, lane: Lane = DEFAULT_LANE, ticket: Optional[Ticket] = None) -> Ticket:
+        """
+        Wait until `wake` grants this request a turn
+        Args:
+            lane: Tenant and class the request is queued under
+            ticket: Ticket from an earlier wait, to wait again in the same place
+        Returns:
+            The ticket, to pass back when the request has to wait again
+        """
+        loop = asyncio.get_running_loop()
+        if ticket is None:
+            if self._waiting >= self.max_queue:
+                ADMISSION_REJECTED.inc(reason="full")
+                raise AdmissionRejected(429, "Too many requests queued for the model", self.retry_after)
+            ticket = self._enqueue(lane, loop.time() + self.timeout)
+
+        waiter = loop.create_future()
+        heapq.heappush(self._heap, (ticket.finish, ticket.seq, waiter))
+        self._waiting += 1
+        try:
+            done, _ = await asyncio.wait((waiter,), timeout=max(0.0, ticket.deadline - loop.time()))
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        if not done:
+            self._abandon(waiter)
+            ADMISSION_REJECTED.inc(reason="timeout")
+            raise AdmissionRejected(503, "Timed out waiting for model capacity", self.retry_after)
+        self._granted -= 1
+        return ticket
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # Granted just as it gave up: hand the turn to the next request
+            self._granted -= 1
+            self.wake()
+        else:
+            waiter.cancel()
+            self._waiting -= 1
+
+    def wake(self) -> None:
+        """Grant freed capacity to the first waiting request in fair order."""
+        while self._heap:
+            finish, _, waiter = heapq.heappop(self._heap)
+            if waiter.cancelled():
+                continue
+            waiter.set_result(None)
+            self._waiting -= 1
+            self._granted += 1
+            self._virtual = max(self._virtual, finish)
+            if len(self._finish) > self.max_queue:
+                # Lanes at or behind virtual time are idle and would restart from it anyway
+                self._finish = {lane: f for lane, f in self._finish.items() if f > self._virtual}
+            return
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+import httpx
+
+from app.logger import log
+
+TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", str(60 * 10)))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "1000"))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "200")
+)
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "60"))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "0").lower() in {"1", "true", "yes"}
+# Seconds to wait for in-flight upstream requests before closing the pool
+UPSTREAM_DRAIN_TIMEOUT = float(os.getenv("UPSTREAM_DRAIN_TIMEOUT", "30"))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class UpstreamClient:
+    """
+    Application-lifetime pooled HTTP client for the vLLM backend.
+
+    - One keep-alive connection pool shared by every handler
+    - Created in the FastAPI lifespan, lazily on first use otherwise
+    - Tracks in-flight requests so shutdown can drain them before closing
+    """
+
+    def __init__(
+        self,
+        timeout: float = TIMEOUT,
+        max_connections: int = UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections: int = UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = UPSTREAM_KEEPALIVE_EXPIRY,
+        http2: bool = UPSTREAM_HTTP2,
+        drain_timeout: float = UPSTREAM_DRAIN_TIMEOUT,
+    ) -> None:
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.drain_timeout = drain_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._requests = 0
+        self._streams: set[httpx.Response] = set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared httpx client, created on first access."""
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    @property
+    def inflight(self) -> int:
+        """Number of upstream requests and open streams not yet released."""
+        return self._requests + len(self._streams)
+
+    def _create_client(self) -> httpx.AsyncClient:
+        if self.http2 and not _http2_available():
+            log.warning("UPSTREAM_HTTP2 requested but 'h2' is not installed, using HTTP/1.1")
+            self.http2 = False
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=self.limits,
+            http2=self.http2,
+        )
+
+    async def start(self) -> None:
+        """Create the connection pool up front (called from the app lifespan)."""
+        if self._client is None:
+            self._client = self._create_client()
+        log.info(
+            "Upstream client started: max_connections=%s, max_keepalive=%s, http2=%s",
+            self.limits.max_connections,
+            self.limits.max_keepalive_connections,
+            self.http2,
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and read the whole response body."""
+        self._requests += 1
+        try:
+            return await self.client.request(method, url, **kwargs)
+        finally:
+            self._requests -= 1
+
+    async def open_stream(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request without reading the body.
+        The caller must release the response with `close`.
+        """
+        request = self.client.build_request(method, url, **kwargs)
+        self._requests += 1
+        try:
+            response = await self.client.send(request, stream=True)
+        finally:
+            self._requests -= 1
+        self._streams.add(response)
+        return response
+
+    async def close(self, response: httpx.Response) -> None:
+        """Close a streamed response and return its connection to the pool."""
+        self._streams.discard(response)
+        await response.aclose()
+
+    async def aclose(self) -> None:
+        """Wait for in-flight requests to finish, then close the pool."""
+        deadline = time.monotonic() + self.drain_timeout
+        while self.inflight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.inflight:
+            log.warning(
+                "Closing upstream client with %d request(s) still in flight", self.inflight
+            )
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+
+upstream = UpstreamClient()
@@ -0,0 +1,319 @@
+import asyncio
+import math
+import os
+import random
+import time
+from hashlib import blake2b
+from typing import Optional
+
+import httpx
+
+from app.logger import log
+from app.metrics import Counter, Gauge
+
+from .admission import ADMISSION_WAIT_SECONDS, DEFAULT_LANE, AdmissionQueue, Lane
+from .client import UpstreamClient, upstream
+
+LEAST = "least"
+P2C = "p2c"
+PREFIX = "prefix"
+
+# Comma-separated vLLM base URLs, VLLM_BASE_URL alone for a single backend
+VLLM_BASE_URLS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("VLLM_BASE_URLS", os.getenv("VLLM_BASE_URL", "http://vllm:8000")).split(",")
+    if url.strip()
+]
+# least: fewest outstanding requests; p2c: the less loaded of two random backends;
+# prefix: rendezvous hashing of the prompt prefix so vLLM's prefix cache is reused
+UPSTREAM_ROUTING = os.getenv("UPSTREAM_ROUTING", LEAST).lower()
+# Prefix routing: a backend takes a prefix only while below this multiple of the mean load
+PREFIX_ROUTING_LOAD_FACTOR = float(os.getenv("PREFIX_ROUTING_LOAD_FACTOR", "1.25"))
+# Consecutive 5xx responses or connect errors before a backend is ejected
+UPSTREAM_EJECT_FAILURES = int(os.getenv("UPSTREAM_EJECT_FAILURES", "3"))
+# Seconds an ejected backend is skipped before it is tried again
+UPSTREAM_EJECT_SECONDS = float(os.getenv("UPSTREAM_EJECT_SECONDS", "10"))
+# Requests and streams each backend serves at once, more wait in the admission queue; 0 is unlimited
+UPSTREAM_MAX_INFLIGHT = int(os.getenv("UPSTREAM_MAX_INFLIGHT", "0"))
+
+UPSTREAM_INFLIGHT = Gauge(
+    "upstream_inflight", "Outstanding requests and open streams per vLLM backend", ("backend",)
+)
+UPSTREAM_EJECTIONS = Counter(
+    "upstream_ejections", "Times a vLLM backend was ejected after repeated failures", ("backend",)
+)
+
+# Errors raised before the request reached the backend, safe to retry elsewhere
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class Backend:
+    """One vLLM server and its passive health state."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.inflight = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def acquire(self) -> None:
+        self.inflight += 1
+        UPSTREAM_INFLIGHT.set(self.inflight, backend=self.url)
+
+    def release(self) -> None:
+        self.inflight -= 1
+        UPSTREAM_INFLIGHT.set(self.inflight, backend=self.url)
+
+
+class UpstreamPool:
+    """
+    Spreads requests over several vLLM backends.
+
+    - Routes by least outstanding requests, power-of-two-choices, or prompt prefix
+      (rendezvous hashing with bounded load, least outstanding for requests without one)
+    - Counts each backend's requests and open streams until they are released
+    - Ejects a backend after consecutive 5xx responses or connect errors and
+      re-admits it after UPSTREAM_EJECT_SECONDS; one more failure ejects it again
+    - Connect errors are retried on another backend, since nothing was sent
+    - With a per-backend in-flight limit, requests wait in a bounded admission
+      queue while every backend is full, served fairly across tenant and class lanes
+    If every backend is ejected, the one due back first is used.
+    """
+
+    def __init__(
+        self,
+        base_urls: list[str] = VLLM_BASE_URLS,
+        client: UpstreamClient = upstream,
+        routing: str = UPSTREAM_ROUTING,
+        eject_failures: int = UPSTREAM_EJECT_FAILURES,
+        eject_seconds: float = UPSTREAM_EJECT_SECONDS,
+        load_factor: float = PREFIX_ROUTING_LOAD_FACTOR,
+        max_inflight: int = UPSTREAM_MAX_INFLIGHT,
+        admission: Optional[AdmissionQueue] = None,
+    ) -> None:
+        if not base_urls:
+            raise ValueError("At least one vLLM base URL is required")
+        self.backends = [Backend(url) for url in base_urls]
+        self.client = client
+        self.routing = routing
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self.load_factor = load_factor
+        self.max_inflight = max_inflight
+        self.admission = admission or AdmissionQueue()
+        self._streams: dict[httpx.Response, Backend] = {}
+        self._turn = 0
+        # Bumped whenever capacity frees up, so a waiter hands on a grant at most once per release
+        self._freed = 0
+
+    def pick(
+        self, exclude: tuple[Backend, ...] = (), routing_key: Optional[bytes] = None
+    ) -> Optional[Backend]:
+        """Choose the backend for the next request, None if every backend is at its in-flight limit."""
+        now = time.monotonic()
+        # Rotate the starting point so ties go round-robin
+        self._turn = (self._turn + 1) % len(self.backends)
+        backends = self.backends[self._turn:] + self.backends[:self._turn]
+        candidates = [b for b in backends if b not in exclude] or backends
+        healthy = [b for b in candidates if b.available(now)]
+        if healthy:
+            candidates = healthy
+        if self.max_inflight:
+            candidates = [b for b in candidates if b.inflight < self.max_inflight]
+            if not candidates:
+                return None
+        if not healthy:
+            return min(candidates, key=lambda b: b.ejected_until)
+        if self.routing == PREFIX and routing_key:
+            return self._pick_by_prefix(candidates, routing_key)
+        if self.routing == P2C and len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        return min(candidates, key=lambda b: b.inflight)
+
+    def _pick_by_prefix(self, candidates: list[Backend], routing_key: bytes) -> Backend:
+        """
+        Highest rendezvous score among backends below the load bound, so a prefix
+        keeps its backend while the set is stable and only moves when it is
+        overloaded or leaves.
+        """
+        digest = blake2b(routing_key, digest_size=16).digest()
+        ranked = sorted(
+            candidates,
+            key=lambda b: blake2b(digest + b.url.encode(), digest_size=8).digest(),
+            reverse=True,
+        )
+        total = sum(b.inflight for b in candidates) + 1
+        bound = math.ceil(total * self.load_factor / len(candidates))
+        for backend in ranked:
+            if backend.inflight < bound:
+                return backend
+        return ranked[0]
+
+    def _record(self, backend: Backend, failed: bool) -> None:
+        if not failed:
+            backend.failures = 0
+            return
+        backend.failures += 1
+        if backend.failures >= self.eject_failures:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            UPSTREAM_EJECTIONS.inc(backend=backend.url)
+            if self.max_inflight:
+                # Nothing is released when the backend comes back, so wake its waiters then
+                asyncio.get_running_loop().call_later(
+                    self.eject_seconds, self._readmit, backend, backend.ejected_until
+                )
+            log.warning(
+                "Ejected vLLM backend %s for %ss after %d failures",
+                backend.url,
+                self.eject_seconds,
+                backend.failures,
+            )
+
+    async def _admit(
+        self, exclude: tuple[Backend, ...], routing_key: Optional[bytes], lane: Lane
+    ) -> Backend:
+        """Pick a backend, waiting in the admission queue while all of them are full."""
+        if not self.admission.busy:
+            backend = self.pick(exclude, routing_key)
+            if backend is not None:
+                return backend
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        ticket = None
+        passed = None
+        while True:
+            ticket = await self.admission.wait(lane, ticket)
+            backend = self.pick(exclude, routing_key)
+            if backend is not None:
+                ADMISSION_WAIT_SECONDS.observe(loop.time() - start, lane=lane.kind)
+                return backend
+            if passed != self._freed and self.pick() is not None:
+                # The free slot is on a backend this request already failed on: hand the
+                # turn to the next waiter, once per release so waiters that all excluded it
+                # do not pass it round in a loop
+                passed = self._freed
+                self.admission.wake()
+
+    def _release(self, backend: Backend) -> None:
+        backend.release()
+        self._freed += 1
+        self.admission.wake()
+
+    def _readmit(self, backend: Backend, ejected_until: float) -> None:
+        """Grant a re-admitted backend's free slots to waiting requests."""
+        if backend.ejected_until != ejected_until:
+            # Ejected again meanwhile; the later ejection schedules its own wake
+            return
+        delay = ejected_until - time.monotonic()
+        if delay > 0:
+            # The loop may run timers a clock tick early
+            asyncio.get_running_loop().call_later(delay, self._readmit, backend, ejected_until)
+            return
+        self._freed += 1
+        for _ in range(self.max_inflight - backend.inflight):
+            self.admission.wake()
+
+    async def _send(
+        self, send, method: str, path: str, routing_key: Optional[bytes], lane: Lane, **kwargs
+    ) -> tuple[Backend, httpx.Response]:
+        tried: tuple[Backend, ...] = ()
+        while True:
+            backend = await self._admit(tried, routing_key, lane)
+            backend.acquire()
+            try:
+                response = await send(method, backend.url + path, **kwargs)
+            except CONNECT_ERRORS:
+                self._release(backend)
+                self._record(backend, failed=True)
+                tried += (backend,)
+                if len(tried) >= len(self.backends):
+                    raise
+                log.warning("vLLM backend %s unreachable, retrying on another", backend.url)
+                continue
+            except BaseException:
+                self._release(backend)
+                raise
+            self._record(backend, failed=response.status_code >= 500)
+            return backend, response
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        routing_key: Optional[bytes] = None,
+        lane: Lane = DEFAULT_LANE,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request to a backend and read the whole response body."""
+        backend, response = await self._send(
+            self.client.request, method, path, routing_key, lane, **kwargs
+        )
+        self._release(backend)
+        return response
+
+    def healthy_backend(self) -> Backend:
+        """First backend that is not ejected, else the one due back first."""
+        now = time.monotonic()
+        for backend in self.backends:
+            if backend.available(now):
+                return backend
+        return min(self.backends, key=lambda b: b.ejected_until)
+
+    async def request_one(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Send a control-plane request (models) to one healthy backend.
+        Bypasses admission and is not counted as in flight.
+        """
+        return await self.client.request(method, self.healthy_backend().url + path, **kwargs)
+
+    async def request_each(
+        self, method: str, path: str, **kwargs
+    ) -> list[tuple[Backend, httpx.Response | Exception]]:
+        """
+        Send a control-plane request (metrics) to every backend concurrently.
+        Bypasses admission and is not counted as in flight.
+        """
+        results = await asyncio.gather(
+            *(self.client.request(method, b.url + path, **kwargs) for b in self.backends),
+            return_exceptions=True,
+        )
+        return list(zip(self.backends, results))
+
+    async def open_stream(
+        self,
+        method: str,
+        path: str,
+        routing_key: Optional[bytes] = None,
+        lane: Lane = DEFAULT_LANE,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Send a request to a backend without reading the body.
+        The caller must release the response with `close`.
+        """
+        backend, response = await self._send(
+            self.client.open_stream, method, path, routing_key, lane, **kwargs
+        )
+        self._streams[response] = backend
+        return response
+
+    async def close(self, response: httpx.Response) -> None:
+        """Close a streamed response and release its backend slot; closing twice is a no-op."""
+        backend: Optional[Backend] = self._streams.pop(response, None)
+        try:
+            await self.client.close(response)
+        finally:
+            if backend is not None:
+                self._release(backend)
+
+
+upstream_pool = UpstreamPool()
+
+Gauge(
+    "admission_queue_depth",
+    "Requests waiting for upstream capacity",
+    callback=lambda: upstream_pool.admission.depth,
+)
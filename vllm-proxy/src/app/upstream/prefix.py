@@ -0,0 +1,55 @@
+import os
+from typing import Any, Optional
+
+from app.codec import dumps
+
+# Leading bytes of the prompt that decide the backend in prefix routing (about 1k tokens)
+PREFIX_ROUTING_BYTES = int(os.getenv("PREFIX_ROUTING_BYTES", "4096"))
+# Non-system messages after the system prompt that are part of the routing prefix.
+# 1 keeps every turn of a conversation on the replica that served its first turn.
+PREFIX_ROUTING_MESSAGES = int(os.getenv("PREFIX_ROUTING_MESSAGES", "1"))
+
+
+def _content_bytes(content: Any) -> bytes:
+    if isinstance(content, str):
+        return content.encode("utf-8")
+    return dumps(content)
+
+
+def prefix_key(
+    request: dict,
+    max_bytes: int = PREFIX_ROUTING_BYTES,
+    max_messages: int = PREFIX_ROUTING_MESSAGES,
+) -> Optional[bytes]:
+    """
+    Leading slice of a chat or completions request that vLLM's prefix cache would reuse
+    Returns:
+        The system messages and the first `max_messages` other messages (or the prompt),
+        cut to `max_bytes`; None when the request has neither
+    """
+    messages = request.get("messages")
+    if isinstance(messages, list) and messages:
+        parts = []
+        others = 0
+        for message in messages:
+            if not isinstance(message, dict):
+                break
+            if message.get("role") not in ("system", "developer"):
+                if others >= max_messages:
+                    break
+                others += 1
+            role = str(message.get("role", "")).encode("utf-8")
+            parts.append(role + b"\x00" + _content_bytes(message.get("content", "")))
+        key = b"\x01".join(parts)
+    else:
+        prompt = request.get("prompt")
+        if isinstance(prompt, list) and prompt and not isinstance(prompt[0], int):
+            # A batch of prompts (strings or token id lists): route on the first
+            prompt = prompt[0]
+        if isinstance(prompt, list) and prompt and isinstance(prompt[0], int):
+            # Token ids: a few bytes each, so a slice of max_bytes ids covers the byte budget
+            prompt = prompt[:max_bytes]
+        if not prompt:
+            return None
+        key = _content_bytes(prompt)
+    return key[:max_bytes] or None
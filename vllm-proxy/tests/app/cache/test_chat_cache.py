@@ -0,0 +1,118 @@
+from unittest.mock import AsyncMock
+
+import time
+
+import pytest
+import redis
+
+from tests.app.test_helpers import setup_test_environment
+
+setup_test_environment()
+
+from app.cache.cache import CACHE_READS, CHAT_CACHE_EXPIRATION, LOCAL_FIRST, REDIS_FIRST, ChatCache
+from app.cache.local_cache import LocalCache
+from app.cache.redis import RedisCache
+
+
+def cache_with_redis(read_strategy, value=None, ttl=None):
+    cache = ChatCache(read_strategy=read_strategy)
+    cache._redis = AsyncMock()
+    cache._redis.get_with_ttl.return_value = (value, ttl)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_local_only_round_trip():
+    cache = ChatCache()
+    cache._redis = None
+
+    await cache.set_chat("chat-1", "value")
+
+    assert await cache.get_chat("chat-1") == "value"
+    assert await cache.get_chat("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_local():
+    cache = ChatCache()
+    cache._redis = AsyncMock()
+    cache._redis.set_string.side_effect = ConnectionError("down")
+    cache._redis.get_with_ttl.side_effect = ConnectionError("down")
+
+    await cache.set_chat("chat-1", "value")
+
+    assert await cache.get_chat("chat-1") == "value"
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_is_preferred():
+    cache = ChatCache()
+    cache._redis = AsyncMock()
+    cache._redis.get_with_ttl.return_value = ("from-redis", 30.0)
+
+    assert await cache.get_chat("chat-1") == "from-redis"
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_skips_redis_after_error():
+    redis_cache = RedisCache(expiration=60)
+    redis_cache.redis_client = AsyncMock()
+    redis_cache.redis_client.get.side_effect = redis.RedisError("timeout")
+
+    assert await redis_cache.get_string("key") is None
+    assert await redis_cache.get_string("key") is None
+    assert await redis_cache.set_string("key", "value") is False
+
+    assert redis_cache.redis_client.get.await_count == 1
+    redis_cache.redis_client.set.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_local_first_skips_redis_on_local_hit():
+    cache = cache_with_redis(LOCAL_FIRST, "from-redis", 30.0)
+    await cache.set_chat("chat-1", "local")
+    local_hits = CACHE_READS.value(layer="local", result="hit")
+
+    assert await cache.get_chat("chat-1") == "local"
+    cache._redis.get_with_ttl.assert_not_called()
+    assert CACHE_READS.value(layer="local", result="hit") == local_hits + 1
+
+    assert await cache.get_chat("chat-2") == "from-redis"
+    cache._redis.get_with_ttl.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_populates_local_layer():
+    cache = cache_with_redis(REDIS_FIRST, "from-redis", 30.0)
+
+    assert await cache.get_chat("chat-1") == "from-redis"
+
+    key = cache._make_key("chat", "chat-1")
+    assert cache._local.get(key) == "from-redis"
+    assert cache._local._read[key].expires_at <= time.monotonic() + 30.0
+
+
+@pytest.mark.asyncio
+async def test_signer_is_published_once_per_interval():
+    cache = cache_with_redis(REDIS_FIRST)
+
+    await cache.set_signer("0a0b0c0d", "addresses")
+    await cache.set_signer("0a0b0c0d", "addresses")
+
+    cache._redis.set_string.assert_awaited_once()
+    assert cache._redis.set_string.await_args.kwargs["expiration"] > CHAT_CACHE_EXPIRATION
+    assert await cache.get_signer("0a0b0c0d") == "addresses"
+    cache._redis.get_with_ttl.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_failed_signer_publish_is_retried():
+    cache = cache_with_redis(REDIS_FIRST)
+    cache._redis.set_string.return_value = False
+
+    await cache.set_signer("0a0b0c0d", "addresses")
+    cache._redis.set_string.return_value = True
+    await cache.set_signer("0a0b0c0d", "addresses")
+    await cache.set_signer("0a0b0c0d", "addresses")
+
+    assert cache._redis.set_string.await_count == 2
@@ -0,0 +1,103 @@
+from tests.app.test_helpers import setup_test_environment
+
+setup_test_environment()
+
+from app.cache.local_cache import ENTRY_OVERHEAD, LOCAL_EVICTIONS, LocalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def entry_size(cache, key, value):
+    cache.set(key, value)
+    size = cache.bytes
+    cache._discard(key)
+    return size
+
+
+def test_entries_are_charged_by_size():
+    cache = LocalCache(expiration=60)
+    cache.set("small", "x")
+    small = cache.bytes
+    cache.set("large", "x" * 10_000)
+
+    assert small > ENTRY_OVERHEAD
+    assert cache.bytes - small >= 10_000
+    cache.set("large", "x")
+    assert cache.bytes < 2 * small + 10
+
+
+def test_read_entries_are_evicted_before_unread_ones():
+    probe = LocalCache(expiration=60)
+    size = entry_size(probe, "key-0", "v" * 100)
+    cache = LocalCache(expiration=60, max_bytes=size * 3)
+    capacity = LOCAL_EVICTIONS.value(reason="capacity")
+
+    cache.set("key-0", "v" * 100)
+    assert cache.get("key-0") is not None
+    for i in range(1, 5):
+        cache.set(f"key-{i}", "v" * 100)
+
+    # key-0 was already fetched, so it goes before any signature nobody has read yet
+    assert cache.get("key-0") is None
+    assert cache.get("key-1") is None
+    assert [cache.get(f"key-{i}") is not None for i in range(2, 5)] == [True, True, True]
+    assert cache.bytes <= cache.max_bytes
+    assert LOCAL_EVICTIONS.value(reason="capacity") == capacity + 2
+
+
+def test_expired_entries_go_before_live_ones():
+    clock = FakeClock()
+    probe = LocalCache(expiration=60)
+    size = entry_size(probe, "key-00", "v" * 100)
+    cache = LocalCache(expiration=60, max_bytes=size * 40, timer=clock)
+    capacity = LOCAL_EVICTIONS.value(reason="capacity")
+    expired = LOCAL_EVICTIONS.value(reason="expired")
+
+    # Copies from Redis with little TTL left, queued behind one with plenty
+    cache.set("key-live", "v" * 100, read=True)
+    for i in range(38):
+        cache.set(f"key-{i:02}", "v" * 100, ttl=5, read=True)
+    clock.now = 10
+    for i in range(38, 68):
+        cache.set(f"key-{i:02}", "v" * 100)
+
+    assert cache.get("key-live") is not None
+    assert all(cache.get(f"key-{i:02}") is not None for i in range(38, 68))
+    assert LOCAL_EVICTIONS.value(reason="capacity") == capacity
+    assert LOCAL_EVICTIONS.value(reason="expired") == expired + 38
+
+
+def test_entries_expire_with_their_own_ttl():
+    clock = FakeClock()
+    cache = LocalCache(expiration=60, timer=clock)
+    expired = LOCAL_EVICTIONS.value(reason="expired")
+
+    cache.set("short", "value", ttl=5)
+    cache.set("long", "value")
+    cache.set("capped", "value", ttl=600)
+    clock.now = 10
+
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+    clock.now = 61
+    assert cache.get("capped") is None
+    assert LOCAL_EVICTIONS.value(reason="expired") == expired + 2
+
+
+def test_expired_entries_are_dropped_on_write():
+    clock = FakeClock()
+    cache = LocalCache(expiration=10, timer=clock)
+    for i in range(100):
+        cache.set(f"key-{i}", "value")
+    clock.now = 11
+
+    cache.set("fresh", "value")
+
+    assert len(cache) == 1
+    assert cache.bytes == entry_size(LocalCache(expiration=10), "fresh", "value")
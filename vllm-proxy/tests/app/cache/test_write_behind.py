@@ -0,0 +1,79 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from tests.app.test_helpers import setup_test_environment
+
+setup_test_environment()
+
+from app.cache.cache import ChatCache
+from app.cache.write_behind import WRITE_BEHIND_DROPPED, WriteBehindQueue
+
+
+def fake_redis(result=True):
+    redis = AsyncMock()
+    redis.set_many.return_value = result
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_writes_are_batched_within_the_window():
+    redis = fake_redis()
+    queue = WriteBehindQueue(redis, window_ms=20, max_items=100)
+
+    for i in range(5):
+        assert queue.put(f"key-{i}", f"value-{i}")
+    redis.set_many.assert_not_called()
+
+    await asyncio.sleep(0.05)
+    redis.set_many.assert_awaited_once_with([(f"key-{i}", f"value-{i}") for i in range(5)])
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_immediately():
+    redis = fake_redis()
+    queue = WriteBehindQueue(redis, window_ms=10_000, max_items=3)
+
+    for i in range(7):
+        queue.put(f"key-{i}", "value")
+    await asyncio.sleep(0)
+
+    assert [len(call.args[0]) for call in redis.set_many.await_args_list] == [3, 3]
+    await queue.aclose()
+    assert [len(call.args[0]) for call in redis.set_many.await_args_list] == [3, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_overflow_is_dropped_and_counted():
+    redis = fake_redis()
+    queue = WriteBehindQueue(redis, window_ms=10_000, max_items=100, max_pending=2)
+    dropped = WRITE_BEHIND_DROPPED.value()
+
+    assert queue.put("a", "1")
+    assert queue.put("b", "2")
+    assert not queue.put("c", "3")
+
+    assert WRITE_BEHIND_DROPPED.value() == dropped + 1
+    await queue.aclose()
+    redis.set_many.assert_awaited_once_with([("a", "1"), ("b", "2")])
+
+
+@pytest.mark.asyncio
+async def test_chat_cache_write_behind_serves_local_and_drains_on_close():
+    cache = ChatCache()
+    cache._redis = fake_redis()
+    cache._redis.get_with_ttl.return_value = (None, None)
+    cache._write_behind = WriteBehindQueue(cache._redis, window_ms=10_000)
+
+    await cache.set_chat("chat-1", "value")
+
+    cache._redis.set_string.assert_not_called()
+    assert await cache.get_chat("chat-1") == "value"
+    assert cache.write_behind_depth == 1
+
+    await cache.aclose()
+    assert cache.write_behind_depth == 0
+    (batch,), _ = cache._redis.set_many.await_args
+    assert batch[0][1] == "value"
@@ -32,6 +32,15 @@ def _report_data(identifier: bytes, nonce: bytes) -> bytes:
     return identifier.ljust(32, b"\x00") + nonce
 
 
+def parse_nonce(nonce=None) -> bytes:
+    if nonce is None:
+        return bytes.fromhex("aa" * 32)
+    nonce_bytes = nonce if isinstance(nonce, bytes) else bytes.fromhex(nonce)
+    if len(nonce_bytes) != 32:
+        raise ValueError("Nonce must be 32 bytes")
+    return nonce_bytes
+
+
 def generate_attestation(context: SigningContext, nonce=None) -> dict:
     if nonce is None:
         nonce_hex = "aa" * 32
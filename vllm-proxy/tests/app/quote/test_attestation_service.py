@@ -0,0 +1,154 @@
+import asyncio
+import threading
+
+import pytest
+
+from tests.app.test_helpers import setup_test_environment
+
+setup_test_environment()
+
+from app.quote.attestation import AttestationBusy, AttestationService
+from tests.app.mock_quote import ecdsa_context, ed25519_context, generate_attestation
+
+
+class CountingGenerator:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, context, nonce=None):
+        with self._lock:
+            self.calls += 1
+        return generate_attestation(context, nonce)
+
+
+@pytest.mark.asyncio
+async def test_nonce_less_reports_are_cached():
+    generate = CountingGenerator()
+    service = AttestationService(cache_ttl=60, generate=generate)
+
+    first = await service.report(ecdsa_context)
+    second = await service.report(ecdsa_context)
+
+    assert first is second
+    assert generate.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_is_per_signing_algorithm_and_expires():
+    generate = CountingGenerator()
+    service = AttestationService(cache_ttl=0.05, generate=generate)
+
+    ecdsa_report = await service.report(ecdsa_context)
+    ed25519_report = await service.report(ed25519_context)
+    assert ecdsa_report["signing_address"] != ed25519_report["signing_address"]
+    assert generate.calls == 2
+
+    await asyncio.sleep(0.1)
+    await service.report(ecdsa_context)
+    assert generate.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_nonce_requests_bypass_the_cache():
+    generate = CountingGenerator()
+    service = AttestationService(cache_ttl=60, generate=generate)
+    await service.report(ecdsa_context)
+
+    report = await service.report(ecdsa_context, "42" * 32)
+
+    assert report["nonce"] == "42" * 32
+    assert generate.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced():
+    generate = CountingGenerator()
+    service = AttestationService(cache_ttl=60, generate=generate)
+
+    async def slow_generate(context, nonce):
+        await asyncio.sleep(0.05)
+        return generate(context, nonce)
+
+    service._generate = slow_generate
+    reports = await asyncio.gather(*(service.report(ecdsa_context) for _ in range(10)))
+
+    assert generate.calls == 1
+    assert all(report is reports[0] for report in reports)
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_regeneration():
+    generate = CountingGenerator()
+    service = AttestationService(cache_ttl=60, generate=generate)
+    await service.report(ecdsa_context)
+
+    service.invalidate()
+    await service.report(ecdsa_context)
+
+    assert generate.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_generation_runs_off_the_event_loop():
+    threads = []
+
+    def generate(context, nonce=None):
+        threads.append(threading.get_ident())
+        return generate_attestation(context, nonce)
+
+    service = AttestationService(cache_ttl=0, generate=generate)
+    await service.report(ecdsa_context)
+    service.shutdown()
+
+    assert threads and threads[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_saturated_queue_is_rejected():
+    release = threading.Event()
+
+    def blocking_generate(context, nonce=None):
+        release.wait(5)
+        return generate_attestation(context, nonce)
+
+    service = AttestationService(
+        cache_ttl=0, generate=blocking_generate, workers=1, max_queue=1, retry_after=7
+    )
+    running = asyncio.ensure_future(service.report(ecdsa_context, "01" * 32))
+    queued = asyncio.ensure_future(service.report(ecdsa_context, "02" * 32))
+    await asyncio.sleep(0.05)
+    assert service.waiting == 1
+
+    with pytest.raises(AttestationBusy) as exc_info:
+        await service.report(ecdsa_context, "03" * 32)
+    assert exc_info.value.retry_after == 7
+
+    release.set()
+    reports = await asyncio.gather(running, queued)
+    assert [report["nonce"] for report in reports] == ["01" * 32, "02" * 32]
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("nonce", ["not-hex", "01" * 16])
+async def test_malformed_nonce_is_rejected_before_queueing(nonce):
+    release = threading.Event()
+
+    def blocking_generate(context, nonce=None):
+        release.wait(5)
+        return generate_attestation(context, nonce)
+
+    service = AttestationService(cache_ttl=0, generate=blocking_generate, workers=1, max_queue=1)
+    running = asyncio.ensure_future(service.report(ecdsa_context, "01" * 32))
+    queued = asyncio.ensure_future(service.report(ecdsa_context, "02" * 32))
+    await asyncio.sleep(0.05)
+
+    # A full queue would answer 503; bad input gets its 400 without taking a slot
+    with pytest.raises(ValueError):
+        await service.report(ecdsa_context, nonce)
+    assert service.waiting == 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    service.shutdown()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from tests.app.test_helpers import setup_test_environment
+
+setup_test_environment()
+
+from app.quote.attestation import AttestationService
+from app.quote.prewarm import PrewarmPool
+from tests.app.mock_quote import ecdsa_context, ed25519_context, generate_attestation
+
+
+class RecordingGenerator:
+    def __init__(self):
+        self.nonces = []
+
+    def __call__(self, context, nonce=None):
+        self.nonces.append(nonce)
+        return generate_attestation(context, nonce)
+
+
+def make_pool(size=2, nonce_ttl=60):
+    generate = RecordingGenerator()
+    service = AttestationService(cache_ttl=0, generate=generate)
+    pool = PrewarmPool(
+        size=size, nonce_ttl=nonce_ttl, service=service, contexts=(ecdsa_context, ed25519_context)
+    )
+    return pool, generate
+
+
+async def wait_until_ready(pool, count):
+    for _ in range(100):
+        if all(len(ready) >= count for ready in pool._ready.values()):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("pool was not refilled")
+
+
+@pytest.mark.asyncio
+async def test_issued_nonce_redeems_pregenerated_report():
+    pool, generate = make_pool()
+    pool.start()
+    await wait_until_ready(pool, 2)
+
+    nonce = pool.issue(ecdsa_context)
+    assert nonce in generate.nonces
+    generated = len(generate.nonces)
+
+    report = await pool.redeem(ecdsa_context, nonce)
+    assert report["nonce"] == nonce
+    assert report["signing_address"] == ecdsa_context.signing_address
+
+    # The issued report is replaced in the background, not on the request path
+    await wait_until_ready(pool, 2)
+    assert len(generate.nonces) == generated + 1
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_nonce_is_single_use_and_bound_to_algorithm():
+    pool, _ = make_pool()
+    pool.start()
+    await wait_until_ready(pool, 1)
+
+    nonce = pool.issue(ecdsa_context)
+    assert await pool.redeem(ed25519_context, nonce) is None
+    assert await pool.redeem(ecdsa_context, nonce) is not None
+    assert await pool.redeem(ecdsa_context, nonce) is None
+    assert await pool.redeem(ecdsa_context, "ff" * 32) is None
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_issue_from_empty_pool_starts_generation():
+    pool, generate = make_pool(size=1)
+
+    nonce = pool.issue(ed25519_context)
+    report = await pool.redeem(ed25519_context, nonce)
+
+    assert report["nonce"] == nonce
+    assert nonce in generate.nonces
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_expired_nonces_are_not_redeemed():
+    pool, _ = make_pool(nonce_ttl=0.05)
+    pool.start()
+    await wait_until_ready(pool, 1)
+
+    nonce = pool.issue(ecdsa_context)
+    await asyncio.sleep(0.1)
+
+    assert await pool.redeem(ecdsa_context, nonce) is None
+    await pool.aclose()
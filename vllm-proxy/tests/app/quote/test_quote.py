@@ -1,5 +1,8 @@
+import base64
 import json
 import sys
+import threading
+import time
 import types
 import unittest
 from importlib.machinery import SourceFileLoader
@@ -11,6 +14,43 @@ class TestQuote(unittest.TestCase):
     def setUp(self):
         self.mock_cc_admin = types.SimpleNamespace(
             collect_gpu_evidence_remote=lambda nonce, **kwargs: [{"mock": "gpu"}],
+            init_nvml=lambda ppcie_mode: None,
+        )
+        self.gpus = {"count": 1, "delay": 0.0, "init": 0}
+        gpus = self.gpus
+
+        class FakeNvmlHandler:
+            @staticmethod
+            def get_number_of_gpus():
+                gpus["init"] += 1
+                return gpus["count"]
+
+            @staticmethod
+            def is_ppcie_mode_enabled():
+                return False
+
+            def __init__(self, index, nonce, settings):
+                time.sleep(gpus["delay"])
+                if nonce == gpus.get("failing_nonce"):
+                    raise Exception(f"GPU {index} did not answer")
+                self.index = index
+                self.nonce = nonce
+
+            def get_gpu_architecture(self):
+                return 9
+
+            def get_attestation_cert_chain(self):
+                return f"chain-{self.index}"
+
+            def get_attestation_report(self):
+                return bytes([self.index]) + self.nonce
+
+        verifier_config = types.SimpleNamespace(
+            GPU_ARCHITECTURE_MAP={9: types.SimpleNamespace(GPU_ARCH_NAME="HOPPER")},
+            BaseSettings=object(),
+        )
+        gpu_cert_chains = types.SimpleNamespace(
+            GpuCertificateChains=types.SimpleNamespace(extract_gpu_cert_chain_base64=lambda chain: chain)
         )
 
         attestation_instance = types.SimpleNamespace(
@@ -38,17 +78,30 @@ class TestQuote(unittest.TestCase):
             quote="mock_quote",
             event_log=json.dumps({"mock": True}),
         )
-        client.info = lambda: types.SimpleNamespace(
-            model_dump=lambda: {
-                "compose_hash": "db669af634b75c7f298400f3b6c2aa8ba54998bac83e23d10ab4eaadc4b50ccf",
-                "tcb_info": {"app_compose": "compose", "mr_config": "01db669af634b75c7f298400f3b6c2aa8ba54998bac83e23d10ab4eaadc4b50ccf"},
-            }
-        )
-        dstack_mod = types.SimpleNamespace(DstackClient=lambda: client)
+        self.calls = {"client": 0, "info": 0}
+
+        def info():
+            self.calls["info"] += 1
+            return types.SimpleNamespace(
+                model_dump=lambda: {
+                    "compose_hash": "db669af634b75c7f298400f3b6c2aa8ba54998bac83e23d10ab4eaadc4b50ccf",
+                    "tcb_info": {"app_compose": "compose", "mr_config": "01db669af634b75c7f298400f3b6c2aa8ba54998bac83e23d10ab4eaadc4b50ccf"},
+                }
+            )
+
+        def make_client():
+            self.calls["client"] += 1
+            return client
+
+        client.info = info
+        dstack_mod = types.SimpleNamespace(DstackClient=make_client)
 
         self.original_modules = {}
         for name, module in {
             "verifier": types.SimpleNamespace(cc_admin=self.mock_cc_admin),
+            "verifier.config": verifier_config,
+            "verifier.nvml": types.SimpleNamespace(NvmlHandler=FakeNvmlHandler),
+            "verifier.nvml.gpu_cert_chains": gpu_cert_chains,
             "nv_attestation_sdk": types.SimpleNamespace(attestation=attestation_mod),
             "pynvml": pynvml_mod,
             "dstack_sdk": dstack_mod,
@@ -81,7 +134,17 @@ class TestQuote(unittest.TestCase):
 
     def tearDown(self):
         sys.modules.update(self.original_modules)
-        for key in ["verifier", "nv_attestation_sdk", "pynvml", "dstack_sdk", "app.quote.quote", "app.quote"]:
+        for key in [
+            "verifier",
+            "verifier.config",
+            "verifier.nvml",
+            "verifier.nvml.gpu_cert_chains",
+            "nv_attestation_sdk",
+            "pynvml",
+            "dstack_sdk",
+            "app.quote.quote",
+            "app.quote",
+        ]:
             sys.modules.pop(key, None)
 
     def test_generate_attestation_binds_nonce(self):
@@ -103,4 +166,104 @@ class TestQuote(unittest.TestCase):
         result = self.quote.generate_attestation(self.quote.ed25519_context)
         self.assertEqual(len(bytes.fromhex(result["request_nonce"])), 32)
 
+    def test_ecdsa_backends_match_eth_account(self):
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+
+        account = self.quote.ecdsa_context._raw_account
+        content = "aa" * 32 + ":" + "bb" * 32
+        eth_account_signature = self.quote.EthAccountBackend(account).sign(content)
+        recovered = Account.recover_message(encode_defunct(text=content), signature=eth_account_signature)
+        self.assertEqual(recovered, self.quote.ecdsa_context.signing_address)
+
+        if self.quote.coincurve is None:
+            self.skipTest("coincurve is not installed")
+        coincurve_signature = self.quote.CoincurveBackend(bytes(account.key)).sign(content)
+        self.assertEqual(coincurve_signature, eth_account_signature)
+        for text in ["", "héllo", "x" * 1000]:
+            signature = self.quote.CoincurveBackend(bytes(account.key)).sign(text)
+            recovered = Account.recover_message(encode_defunct(text=text), signature=signature)
+            self.assertEqual(recovered, self.quote.ecdsa_context.signing_address)
+
+    def test_ecdsa_backend_selection(self):
+        account = self.quote.ecdsa_context._raw_account
+        backend = self.quote._ecdsa_backend(account, "eth_account")
+        self.assertIsInstance(backend, self.quote.EthAccountBackend)
+        if self.quote.coincurve is not None:
+            self.assertIsInstance(self.quote._ecdsa_backend(account, "auto"), self.quote.CoincurveBackend)
+
+    def test_backend_without_sign_cannot_be_created(self):
+        class Unfinished(self.quote.SigningBackend):
+            name = "unfinished"
+
+        with self.assertRaises(TypeError):
+            Unfinished()
+
+    def test_boot_state_is_reused_until_invalidated(self):
+        first = self.quote.generate_attestation(self.quote.ed25519_context)
+        second = self.quote.generate_attestation(self.quote.ecdsa_context)
+
+        self.assertEqual(self.calls, {"client": 1, "info": 1})
+        self.assertIs(first["info"], second["info"])
+        self.assertIs(first["event_log"], second["event_log"])
+        self.assertNotEqual(first["request_nonce"], second["request_nonce"])
+
+        self.quote.boot_state.invalidate()
+        self.quote.generate_attestation(self.quote.ed25519_context)
+        self.assertEqual(self.calls, {"client": 2, "info": 2})
+
+    def test_event_log_is_reparsed_when_it_changes(self):
+        state = self.quote.BootState()
+        first = state.event_log(json.dumps({"rtmr": 1}))
+        self.assertIs(state.event_log(json.dumps({"rtmr": 1})), first)
+        self.assertEqual(state.event_log(json.dumps({"rtmr": 2})), {"rtmr": 2})
+
+    def test_gpu_evidence_is_collected_in_parallel_and_in_order(self):
+        self.gpus.update(count=4, delay=0.1)
+        nonce_hex = "cc" * 32
+        collector = self.quote.GpuEvidenceCollector()
+
+        started = time.perf_counter()
+        evidence = collector.collect(nonce_hex)
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual([item["certificate"] for item in evidence], [f"chain-{i}" for i in range(4)])
+        for index, item in enumerate(evidence):
+            self.assertEqual(set(item), {"certificate", "evidence", "arch"})
+            self.assertEqual(item["arch"], "HOPPER")
+            report = base64.b64decode(item["evidence"])
+            self.assertEqual(report, bytes([index]) + bytes.fromhex(nonce_hex))
+
+        collector.collect(nonce_hex)
+        self.assertEqual(self.gpus["init"], 1)
+        collector.shutdown()
+
+    def test_failed_collection_waits_for_concurrent_ones_before_shutdown(self):
+        self.gpus.update(count=4, delay=0.1, failing_nonce=bytes.fromhex("dd" * 32))
+        collector = self.quote.GpuEvidenceCollector()
+        results = {}
+
+        def collect(name, nonce_hex):
+            try:
+                results[name] = collector.collect(nonce_hex)
+            except Exception as exc:
+                results[name] = exc
+
+        threads = [
+            threading.Thread(target=collect, args=("failing", "dd" * 32)),
+            threading.Thread(target=collect, args=("healthy", "cc" * 32)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsInstance(results["failing"], Exception)
+        self.assertEqual(len(results["healthy"]), 4)
+        self.assertEqual(collector._active, 0)
+        self.assertIsNone(collector._executor)
 
+        collector.collect("cc" * 32)
+        self.assertEqual(self.gpus["init"], 2)
+        collector.shutdown()
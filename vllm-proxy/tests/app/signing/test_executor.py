@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.signing.executor import SIGNING_JOBS, SIGNING_SATURATED, SigningExecutor
+
+
+@pytest.mark.asyncio
+async def test_run_signs_off_the_event_loop():
+    executor = SigningExecutor(max_workers=2, max_pending=4)
+    loop_thread = threading.get_ident()
+
+    result = await executor.run(lambda text: (text.upper(), threading.get_ident()), "abc")
+
+    assert result[0] == "ABC"
+    assert result[1] != loop_thread
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_bounds_pending_jobs():
+    executor = SigningExecutor(max_workers=1, max_pending=1)
+    release = threading.Event()
+    saturated_before = SIGNING_SATURATED.value()
+
+    first = asyncio.create_task(executor.run(release.wait))
+    await asyncio.sleep(0.05)
+    second = asyncio.create_task(executor.run(lambda: "second"))
+    await asyncio.sleep(0.05)
+
+    assert executor.pending == 2
+    assert not second.done()
+    assert SIGNING_SATURATED.value() == saturated_before + 1
+
+    release.set()
+    assert await first is True
+    assert await second == "second"
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_errors():
+    executor = SigningExecutor(max_workers=1, max_pending=1)
+    errors_before = SIGNING_JOBS.value(result="error")
+
+    def fail():
+        raise ValueError("Signing context is not properly initialised")
+
+    with pytest.raises(ValueError):
+        await executor.run(fail)
+
+    assert SIGNING_JOBS.value(result="error") == errors_before + 1
+    assert executor.pending == 0
+    executor.shutdown()
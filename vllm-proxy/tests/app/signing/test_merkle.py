@@ -0,0 +1,78 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.signing.batch import BatchSigner
+from app.signing.executor import SigningExecutor
+from app.signing.merkle import build_tree, compute_root, verify_proof
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "verifiers"))
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 8, 13])
+def test_every_proof_reaches_the_root(count):
+    texts = [f"{i:064x}:{i + 1:064x}" for i in range(count)]
+
+    root, proofs = build_tree(texts)
+
+    assert len(proofs) == count
+    for text, proof in zip(texts, proofs):
+        assert verify_proof(text, proof, root)
+
+
+def test_proof_rejects_other_text():
+    texts = ["a:b", "c:d", "e:f"]
+    root, proofs = build_tree(texts)
+
+    assert not verify_proof("a:x", proofs[0], root)
+    assert not verify_proof("c:d", proofs[0], root)
+
+
+def test_leaf_alone_is_not_the_root():
+    root, proofs = build_tree(["a:b", "c:d"])
+
+    assert compute_root("a:b", []) != root
+    assert proofs[0][0]["position"] == "right"
+    assert proofs[1][0]["position"] == "left"
+
+
+def test_verifier_accepts_server_proofs():
+    signature_verifier = pytest.importorskip("signature_verifier")
+    texts = [f"req{i}:resp{i}" for i in range(7)]
+
+    root, proofs = build_tree(texts)
+
+    for text, proof in zip(texts, proofs):
+        assert signature_verifier.merkle_root_from_proof(text, proof) == root
+
+
+@pytest.mark.asyncio
+async def test_batch_signer_shares_one_root_signature():
+    executor = SigningExecutor(max_workers=1, max_pending=4)
+    batch_signer = BatchSigner(window_ms=50, max_items=100, executor=executor)
+    texts = [f"req{i}:resp{i}" for i in range(5)]
+
+    records = await asyncio.gather(*(batch_signer.sign(text) for text in texts))
+
+    roots = {record["merkle_root"] for record in records}
+    assert len(roots) == 1
+    assert len({record["signature_ecdsa"] for record in records}) == 1
+    for text, record in zip(texts, records):
+        assert record["text"] == text
+        assert verify_proof(text, record["merkle_proof"], record["merkle_root"])
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_batch_signer_flushes_at_max_items():
+    executor = SigningExecutor(max_workers=1, max_pending=4)
+    batch_signer = BatchSigner(window_ms=60_000, max_items=2, executor=executor)
+
+    records = await asyncio.wait_for(
+        asyncio.gather(batch_signer.sign("a:b"), batch_signer.sign("c:d")), timeout=5
+    )
+
+    assert records[0]["merkle_root"] == records[1]["merkle_root"]
+    executor.shutdown()
@@ -0,0 +1,76 @@
+import json
+import os
+from hashlib import sha256
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from app.signing.record import (
+    COMPACT,
+    COMPACT_SIZE,
+    JSON,
+    compact_key_id,
+    decode_record,
+    encode_record,
+    signer_entry,
+    signer_key_id,
+)
+
+
+def signed_record(text=None):
+    text = text or f"{sha256(b'request').hexdigest()}:{sha256(b'response').hexdigest()}"
+    account = Account.create()
+    ed_key = Ed25519PrivateKey.generate()
+    return dict(
+        text=text,
+        signature_ecdsa="0x" + account.sign_message(encode_defunct(text=text)).signature.hex().removeprefix("0x"),
+        signing_address_ecdsa=account.address,
+        signature_ed25519=ed_key.sign(text.encode()).hex(),
+        signing_address_ed25519=os.urandom(32).hex(),
+    )
+
+
+def test_compact_round_trip():
+    record = signed_record()
+
+    key_id, value = encode_record(record, COMPACT)
+
+    assert isinstance(value, bytes)
+    assert len(value) == COMPACT_SIZE
+    assert len(value) * 3 < len(json.dumps(record))
+    assert key_id == signer_key_id(record["signing_address_ecdsa"], record["signing_address_ed25519"])
+    assert compact_key_id(value) == key_id
+    assert decode_record(value, json.loads(signer_entry(record))) == record
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        signed_record(text="custom-request-hash:" + "ab" * 32),
+        {**signed_record(), "merkle_root": "00" * 32, "merkle_proof": []},
+        {"text": "aa" * 32 + ":" + "bb" * 32, "seal": "cc" * 32},
+    ],
+    ids=["non-hex-text", "batch", "lazy"],
+)
+def test_records_outside_the_layout_stay_json(record):
+    key_id, value = encode_record(record, COMPACT)
+
+    assert key_id is None
+    assert compact_key_id(value) is None
+    assert decode_record(value) == record
+
+
+def test_json_format_is_default_layout():
+    record = signed_record()
+    key_id, value = encode_record(record, JSON)
+    assert key_id is None
+    assert json.loads(value) == record
+    assert decode_record(value.encode()) == record
+
+
+def test_compact_record_needs_its_signer():
+    _, value = encode_record(signed_record(), COMPACT)
+    with pytest.raises(ValueError):
+        decode_record(value)
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.batching import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_depth_counts_batches_until_their_handler_returns():
+    release = asyncio.Event()
+    batches = []
+
+    async def handler(batch):
+        batches.append(batch)
+        await release.wait()
+
+    batcher = MicroBatcher(handler, window_ms=10_000, max_items=2)
+    for i in range(3):
+        batcher.add(i)
+    await asyncio.sleep(0)
+
+    assert batches == [[0, 1]]
+    assert batcher.depth == 3
+
+    release.set()
+    await batcher.aclose()
+    assert batches == [[0, 1], [2]]
+    assert batcher.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_released():
+    async def handler(batch):
+        raise RuntimeError("handler failed")
+
+    batcher = MicroBatcher(handler, window_ms=1, max_items=10)
+    batcher.add("a")
+    await asyncio.sleep(0.02)
+
+    assert batcher.depth == 0
+    await batcher.aclose()
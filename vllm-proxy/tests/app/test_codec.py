@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from app import codec
+from app.api.response.response import FastJSONResponse
+
+
+def test_select_codec_falls_back_to_stdlib(monkeypatch):
+    monkeypatch.setitem(codec.BACKENDS, "orjson", lambda: None)
+    monkeypatch.setitem(codec.BACKENDS, "msgspec", lambda: None)
+
+    assert codec.select_codec("auto") is codec.STDLIB_CODEC
+    assert codec.select_codec("orjson") is codec.STDLIB_CODEC
+    assert codec.select_codec("unknown") is codec.STDLIB_CODEC
+
+
+@pytest.mark.parametrize("name", ["orjson", "msgspec", "json"])
+def test_backends_round_trip(name):
+    backend = codec.BACKENDS[name]()
+    if backend is None:
+        pytest.skip(f"{name} is not installed")
+    payload = {"id": "chatcmpl-1", "messages": [{"role": "user", "content": "héllo"}], "n": 2}
+
+    encoded = backend.dumps(payload)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == payload
+    assert backend.loads(encoded) == payload
+
+
+def test_loads_raises_value_error():
+    with pytest.raises(ValueError):
+        codec.loads(b'{"id": ')
+
+
+def test_dumps_falls_back_for_large_integers():
+    value = 2**70 + 1
+
+    assert json.loads(codec.dumps({"seed": value})) == {"seed": value}
+
+
+def test_fast_json_response_renders_compact_utf8():
+    response = FastJSONResponse(content={"text": "héllo"})
+
+    assert response.body == '{"text":"héllo"}'.encode()
+    assert response.headers["content-type"] == "application/json"
@@ -32,6 +32,9 @@ def setup_verifier_mock():
     mock_verifier.cc_admin = mock_cc_admin
     sys.modules['verifier'] = mock_verifier
     sys.modules['verifier.cc_admin'] = mock_cc_admin
+    sys.modules['verifier.config'] = mock_verifier.config
+    sys.modules['verifier.nvml'] = mock_verifier.nvml
+    sys.modules['verifier.nvml.gpu_cert_chains'] = mock_verifier.nvml.gpu_cert_chains
 
 class MockDstackClientClass:
     def __init__(self):
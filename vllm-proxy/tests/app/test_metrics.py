@@ -0,0 +1,58 @@
+import pytest
+
+from app import metrics
+
+
+def test_render_prometheus_text():
+    counter = metrics.Counter("test_requests", "Test requests", ("result",))
+    summary = metrics.Summary("test_latency_seconds", "Test latency")
+    gauge = metrics.Gauge("test_depth", "Test depth", callback=lambda: 3)
+    try:
+        counter.inc(result="ok")
+        counter.inc(2, result="ok")
+        summary.observe(0.5)
+        summary.observe(1.5)
+
+        text = metrics.render()
+    finally:
+        for metric in (counter, summary, gauge):
+            metrics.REGISTRY.remove(metric)
+
+    assert "# TYPE vllm_proxy_test_requests counter" in text
+    assert 'vllm_proxy_test_requests_total{result="ok"} 3' in text
+    assert "vllm_proxy_test_latency_seconds_count 2" in text
+    assert "vllm_proxy_test_latency_seconds_sum 2.0" in text
+    assert "vllm_proxy_test_depth 3" in text
+
+
+def test_merge_exposition_labels_each_source_and_groups_families():
+    a = (
+        "# HELP vllm:num_requests_waiting Waiting requests\n"
+        "# TYPE vllm:num_requests_waiting gauge\n"
+        'vllm:num_requests_waiting{model_name="m"} 2.0\n'
+        "# TYPE vllm:prompt_tokens counter\n"
+        "vllm:prompt_tokens_total 10.0\n"
+    )
+    b = a.replace("2.0", "5.0").replace("10.0", "30.0")
+
+    text = metrics.merge_exposition([("http://a:8000", a), ("http://b:8000", b)], "backend")
+
+    assert text.splitlines() == [
+        "# HELP vllm:num_requests_waiting Waiting requests",
+        "# TYPE vllm:num_requests_waiting gauge",
+        'vllm:num_requests_waiting{backend="http://a:8000",model_name="m"} 2.0',
+        'vllm:num_requests_waiting{backend="http://b:8000",model_name="m"} 5.0',
+        "# TYPE vllm:prompt_tokens counter",
+        'vllm:prompt_tokens_total{backend="http://a:8000"} 10.0',
+        'vllm:prompt_tokens_total{backend="http://b:8000"} 30.0',
+    ]
+
+
+def test_metric_without_samples_cannot_be_created():
+    class Unfinished(metrics._Metric):
+        type = "untyped"
+
+    registered = len(metrics.REGISTRY)
+    with pytest.raises(TypeError):
+        Unfinished("test_unfinished", "Never registered")
+    assert len(metrics.REGISTRY) == registered
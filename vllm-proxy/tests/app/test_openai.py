@@ -1,8 +1,10 @@
+import asyncio
 from unittest.mock import patch, AsyncMock
 import httpx
 import pytest
 from fastapi.testclient import TestClient
 import json
+from hashlib import sha256
 
 # Import and setup test environment before importing app
 from tests.app.test_helpers import setup_test_environment, TEST_AUTH_HEADER
@@ -17,11 +19,15 @@ sys.modules["app.quote.quote"] = __import__("tests.app.mock_quote", fromlist=[""
 
 # Now we can safely import app code
 from app.main import app
-from app.api.v1.openai import VLLM_URL, VLLM_BASE_URL
+from app.api.v1.openai import CHAT_COMPLETIONS_PATH, COMPLETIONS_PATH, METRICS_PATH
+from app.upstream.pool import VLLM_BASE_URLS
 from tests.app.mock_quote import ED25519, ECDSA, ecdsa_quote, ed25519_quote
 
 client = TestClient(app)
 
+VLLM_BASE_URL = VLLM_BASE_URLS[0]
+VLLM_URL = VLLM_BASE_URL + CHAT_COMPLETIONS_PATH
+
 
 async def yield_sse_response(data_list):
     for data in data_list:
@@ -162,7 +168,7 @@ async def test_signature_default_algo():
     )
 
     # Only mock the cache, use real quote object
-    with patch("app.api.v1.openai.cache") as mock_cache:
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
         # Setup mock cache
         mock_cache.get_chat.return_value = cache_data
 
@@ -197,7 +203,7 @@ async def test_signature_explicit_algo():
     )
 
     # Only mock the cache, use real quote object
-    with patch("app.api.v1.openai.cache") as mock_cache:
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
         # Setup mock cache
         mock_cache.get_chat.return_value = cache_data
 
@@ -232,7 +238,7 @@ async def test_signature_invalid_algo():
     )
 
     # Only mock the cache
-    with patch("app.api.v1.openai.cache") as mock_cache:
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
         mock_cache.get_chat.return_value = cache_data
 
         # Make request with invalid algorithm
@@ -248,12 +254,62 @@ async def test_signature_invalid_algo():
         assert response_data["error"]["type"] == "invalid_signing_algo"
 
 
+@pytest.mark.asyncio
+async def test_attestation_report_busy():
+    from app.quote.attestation import AttestationBusy
+
+    with patch("app.api.v1.openai.attestation_service") as mock_service:
+        mock_service.report = AsyncMock(side_effect=AttestationBusy(5))
+
+        response = client.get(
+            "/v1/attestation/report", headers={"Authorization": TEST_AUTH_HEADER}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+        assert response.json()["error"]["type"] == "service_unavailable"
+
+
+@pytest.mark.asyncio
+async def test_attestation_nonce_disabled():
+    response = client.get("/v1/attestation/nonce", headers={"Authorization": TEST_AUTH_HEADER})
+
+    assert response.status_code == 404
+    assert response.json()["error"]["type"] == "not_found"
+
+
+@pytest.mark.asyncio
+async def test_attestation_report_for_issued_nonce():
+    nonce = "ab" * 32
+    report = {"signing_address": "0xMockECDSAAddress", "nonce": nonce}
+
+    with patch("app.api.v1.openai.prewarm_pool") as mock_pool, patch(
+        "app.api.v1.openai.attestation_service"
+    ) as mock_service:
+        mock_pool.enabled = True
+        mock_pool.nonce_ttl = 300
+        mock_pool.issue.return_value = nonce
+        mock_pool.redeem = AsyncMock(return_value=report)
+        mock_service.report = AsyncMock()
+
+        issued = client.get("/v1/attestation/nonce", headers={"Authorization": TEST_AUTH_HEADER})
+        assert issued.status_code == 200
+        assert issued.json() == {"nonce": nonce, "signing_algo": ECDSA, "expires_in": 300}
+
+        response = client.get(
+            f"/v1/attestation/report?nonce={nonce}", headers={"Authorization": TEST_AUTH_HEADER}
+        )
+        assert response.status_code == 200
+        assert response.json()["nonce"] == nonce
+        mock_service.report.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_signature_chat_not_found():
     chat_id = "nonexistent-chat"
 
     # Mock the cache to return None for chat not found
-    with patch("app.api.v1.openai.cache") as mock_cache:
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
         mock_cache.get_chat.return_value = None
 
         # Make request
@@ -322,7 +378,7 @@ async def test_chat_completions_with_request_hash_streaming(respx_mock):
     )
 
     # Mock cache and logging to verify hash usage
-    with patch("app.api.v1.openai.cache") as mock_cache, patch(
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache, patch(
         "app.api.v1.openai.log"
     ) as mock_log:
 
@@ -384,7 +440,7 @@ async def test_chat_completions_with_request_hash_non_streaming(respx_mock):
     )
 
     # Mock cache and logging to verify hash usage
-    with patch("app.api.v1.openai.cache") as mock_cache, patch(
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache, patch(
         "app.api.v1.openai.log"
     ) as mock_log:
 
@@ -447,7 +503,7 @@ async def test_completions_with_request_hash_streaming(respx_mock):
     ]
 
     # Setup RESPX mock for completions endpoint
-    route = respx_mock.post(f"{VLLM_BASE_URL}/v1/completions").mock(
+    route = respx_mock.post(VLLM_BASE_URL + COMPLETIONS_PATH).mock(
         return_value=httpx.Response(
             200,
             stream=yield_sse_response(responses),
@@ -456,7 +512,7 @@ async def test_completions_with_request_hash_streaming(respx_mock):
     )
 
     # Mock cache and logging to verify hash usage
-    with patch("app.api.v1.openai.cache") as mock_cache, patch(
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache, patch(
         "app.api.v1.openai.log"
     ) as mock_log:
 
@@ -503,12 +559,12 @@ async def test_completions_with_request_hash_non_streaming(respx_mock):
     }
 
     # Setup RESPX mock for completions endpoint
-    route = respx_mock.post(f"{VLLM_BASE_URL}/v1/completions").mock(
+    route = respx_mock.post(VLLM_BASE_URL + COMPLETIONS_PATH).mock(
         return_value=httpx.Response(200, json=response_data)
     )
 
     # Mock cache and logging to verify hash usage
-    with patch("app.api.v1.openai.cache") as mock_cache, patch(
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache, patch(
         "app.api.v1.openai.log"
     ) as mock_log:
 
@@ -567,7 +623,7 @@ async def test_chat_completions_without_request_hash(respx_mock):
     )
 
     # Mock cache and logging to verify hash calculation
-    with patch("app.api.v1.openai.cache") as mock_cache, patch(
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache, patch(
         "app.api.v1.openai.log"
     ) as mock_log:
 
@@ -589,3 +645,636 @@ async def test_chat_completions_without_request_hash(respx_mock):
 
         # Verify cache was called
         mock_cache.set_chat.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_stream_hashes_bytes_forwarded_to_client(respx_mock):
+    request_data = {
+        "model": "test-model",
+        "messages": [{"role": "user", "content": "Hello"}],
+        "stream": True,
+    }
+
+    # A multi-byte character split across two upstream reads
+    first = b'data: {"id": "chatcmpl-utf8", "choices": [{"delta": {"role": "assistant"}}]}\n\n'
+    rest = 'data: {"id": "chatcmpl-utf8", "choices": [{"delta": {"content": "héllo"}}]}\n\ndata: [DONE]\n\n'.encode()
+    body = first + rest
+    split_at = rest.index("é".encode()) + 1
+
+    async def raw_stream():
+        yield first
+        yield rest[:split_at]
+        yield rest[split_at:]
+
+    respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(
+            200, stream=raw_stream(), headers={"Content-Type": "text/event-stream"}
+        )
+    )
+
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
+        response = client.post(
+            "/v1/chat/completions",
+            json=request_data,
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+
+        assert response.status_code == 200
+        assert response.content == body
+
+        chat_id, cached = mock_cache.set_chat.call_args[0]
+        assert chat_id == "chatcmpl-utf8"
+        response_sha256 = json.loads(cached)["text"].split(":")[1]
+        assert response_sha256 == sha256(body).hexdigest()
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_stream_extracts_chat_id_from_split_and_coalesced_frames(respx_mock):
+    request_data = {
+        "model": "test-model",
+        "messages": [{"role": "user", "content": "Hello"}],
+        "stream": True,
+    }
+
+    body = (
+        b'data: {"id": "chatcmpl-frames", "choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        b'data: {"id": "chatcmpl-frames", "choices": [{"delta": {"content": "Hi"}}]}\n\n'
+        b"data: [DONE]\n\n"
+    )
+
+    async def raw_stream():
+        # First frame split mid-JSON, the remainder coalesced into one read
+        yield body[:20]
+        yield body[20:]
+
+    respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(
+            200, stream=raw_stream(), headers={"Content-Type": "text/event-stream"}
+        )
+    )
+
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
+        response = client.post(
+            "/v1/chat/completions",
+            json=request_data,
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+
+        assert response.status_code == 200
+        assert response.content == body
+        assert mock_cache.set_chat.call_args[0][0] == "chatcmpl-frames"
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_request_body_forwarded_untouched_without_rewrite(respx_mock):
+    # Unusual spacing would not survive a json.loads/json.dumps round trip
+    request_body = b'{"model":"test-model",  "messages":[{"role":"user","content":"Hi","tool_calls":[{"id":"call-1"}]}]}'
+
+    route = respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(200, json={"id": "chatcmpl-raw", "choices": []})
+    )
+
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock):
+        response = client.post(
+            "/v1/chat/completions",
+            content=request_body,
+            headers={"Authorization": TEST_AUTH_HEADER, "Content-Type": "application/json"},
+        )
+
+    assert response.status_code == 200
+    assert route.calls.last.request.content == request_body
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_request_body_rewritten_with_empty_tool_calls(respx_mock):
+    request_data = {
+        "model": "test-model",
+        "messages": [
+            {"role": "assistant", "content": "Hi", "tool_calls": []},
+            {"role": "user", "content": "Hello"},
+        ],
+    }
+
+    route = respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(200, json={"id": "chatcmpl-strip", "choices": []})
+    )
+
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock):
+        response = client.post(
+            "/v1/chat/completions",
+            json=request_data,
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+
+    assert response.status_code == 200
+    forwarded = json.loads(route.calls.last.request.content)
+    assert "tool_calls" not in forwarded["messages"][0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_non_stream_response_forwarded_verbatim(respx_mock):
+    request_data = {
+        "model": "test-model",
+        "messages": [{"role": "user", "content": "Hello"}],
+        "stream": False,
+    }
+    # Formatting that a parse/re-render would not reproduce
+    upstream_body = b'{"id": "chatcmpl-verbatim",\n "object": "chat.completion", "choices": [{"message": {"content": "h\\u00e9llo"}}]}'
+
+    respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(
+            200, content=upstream_body, headers={"Content-Type": "application/json"}
+        )
+    )
+
+    with patch("app.api.v1.openai.cache", new_callable=AsyncMock) as mock_cache:
+        response = client.post(
+            "/v1/chat/completions",
+            json=request_data,
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+
+        assert response.status_code == 200
+        assert response.content == upstream_body
+        assert response.headers["content-type"] == "application/json"
+
+        chat_id, cached = mock_cache.set_chat.call_args[0]
+        assert chat_id == "chatcmpl-verbatim"
+        assert json.loads(cached)["text"].split(":")[1] == sha256(upstream_body).hexdigest()
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_metrics_appends_proxy_metrics(respx_mock):
+    respx_mock.get(VLLM_BASE_URL + METRICS_PATH).mock(
+        return_value=httpx.Response(200, text="vllm:num_requests_running 1.0\n")
+    )
+
+    response = client.get("/v1/metrics")
+
+    assert response.status_code == 200
+    assert response.text.startswith("vllm:num_requests_running 1.0\n")
+    assert "vllm_proxy_signing_queue_depth" in response.text
+
+
+class DictCache:
+    """In-memory stand-in for ChatCache."""
+
+    def __init__(self):
+        self.values = {}
+        self.writes = 0
+
+    async def set_chat(self, chat_id, chat):
+        self.writes += 1
+        self.values[chat_id] = chat
+
+    async def get_chat(self, chat_id):
+        return self.values.get(chat_id)
+
+    async def set_signer(self, key_id, signer, force=False):
+        self.values[f"signer:{key_id}"] = signer
+
+    async def get_signer(self, key_id):
+        return self.values.get(f"signer:{key_id}")
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_lazy_signing_signs_on_first_retrieval(respx_mock):
+    from app.signing.chat import sign_chat
+
+    request_data = {"model": "test-model", "messages": [{"role": "user", "content": "Hello"}]}
+    respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(200, json={"id": "chatcmpl-lazy", "choices": []})
+    )
+    fake_cache = DictCache()
+
+    with patch("app.api.v1.openai.cache", fake_cache), patch(
+        "app.api.v1.openai.SIGNING_MODE", "lazy"
+    ), patch("app.api.v1.openai.sign_chat") as eager_sign:
+        response = client.post(
+            "/v1/chat/completions",
+            json=request_data,
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+        assert response.status_code == 200
+        eager_sign.assert_not_called()
+
+        stored = json.loads(fake_cache.values["chatcmpl-lazy"])
+        assert "signature_ecdsa" not in stored and "signature_ed25519" not in stored
+
+        first = client.get(
+            "/v1/signature/chatcmpl-lazy?signing_algo=ed25519",
+            headers={"Authorization": TEST_AUTH_HEADER},
+        ).json()
+        memoized = json.loads(fake_cache.values["chatcmpl-lazy"])
+        assert memoized["signature_ed25519"] == first["signature"]
+        assert "signature_ecdsa" not in memoized
+
+        writes = fake_cache.writes
+        second = client.get(
+            "/v1/signature/chatcmpl-lazy?signing_algo=ed25519",
+            headers={"Authorization": TEST_AUTH_HEADER},
+        ).json()
+        assert second == first
+        assert fake_cache.writes == writes
+
+    # Same output as eager signing of the same hashes
+    eager = sign_chat(first["text"])
+    assert first["signature"] == eager["signature_ed25519"]
+    assert first["signing_address"] == eager["signing_address_ed25519"]
+
+
+@pytest.mark.asyncio
+async def test_lazy_signing_refuses_foreign_records():
+    fake_cache = DictCache()
+    fake_cache.values["chatcmpl-forged"] = json.dumps({"text": "forged:hashes", "seal": "00" * 32})
+
+    with patch("app.api.v1.openai.cache", fake_cache):
+        response = client.get(
+            "/v1/signature/chatcmpl-forged", headers={"Authorization": TEST_AUTH_HEADER}
+        )
+
+    assert response.status_code == 404
+    assert fake_cache.writes == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_batch_signing_returns_merkle_proof(respx_mock):
+    from app.signing.merkle import verify_proof
+
+    request_data = {"model": "test-model", "messages": [{"role": "user", "content": "Hello"}]}
+    respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(200, json={"id": "chatcmpl-batch", "choices": []})
+    )
+    fake_cache = DictCache()
+
+    with patch("app.api.v1.openai.cache", fake_cache), patch(
+        "app.api.v1.openai.SIGNING_MODE", "batch"
+    ):
+        response = client.post(
+            "/v1/chat/completions",
+            json=request_data,
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+        assert response.status_code == 200
+
+        payload = client.get(
+            "/v1/signature/chatcmpl-batch", headers={"Authorization": TEST_AUTH_HEADER}
+        ).json()
+
+    assert payload["signing_algo"] == ECDSA
+    assert payload["signature"]
+    assert verify_proof(payload["text"], payload["merkle_proof"], payload["merkle_root"])
+
+
+@pytest.mark.asyncio
+async def test_signature_from_compact_record():
+    from app.signing.record import COMPACT, encode_record, signer_entry
+
+    text = "ab" * 32 + ":" + "cd" * 32
+    record = dict(
+        text=text,
+        signature_ecdsa="0x" + "11" * 65,
+        signing_address_ecdsa="0xAbCdEf0123456789aBcDeF0123456789AbCdEf01",
+        signature_ed25519="22" * 64,
+        signing_address_ed25519="33" * 32,
+    )
+    key_id, value = encode_record(record, COMPACT)
+    fake_cache = DictCache()
+    fake_cache.values["chatcmpl-compact"] = value
+    await fake_cache.set_signer(key_id, signer_entry(record))
+
+    with patch("app.api.v1.openai.cache", fake_cache):
+        ecdsa = client.get(
+            "/v1/signature/chatcmpl-compact", headers={"Authorization": TEST_AUTH_HEADER}
+        ).json()
+        ed25519 = client.get(
+            "/v1/signature/chatcmpl-compact?signing_algo=ed25519",
+            headers={"Authorization": TEST_AUTH_HEADER},
+        ).json()
+
+    assert ecdsa["text"] == text
+    assert ecdsa["signature"] == record["signature_ecdsa"]
+    assert ecdsa["signing_address"] == record["signing_address_ecdsa"]
+    assert ed25519["signature"] == record["signature_ed25519"]
+    assert ed25519["signing_address"] == record["signing_address_ed25519"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_chat_completions_are_balanced_over_backends(respx_mock):
+    from app.upstream.pool import UpstreamPool
+
+    fleet = ["http://vllm-a:8000", "http://vllm-b:8000"]
+    routes = [
+        respx_mock.post(f"{url}/v1/chat/completions").mock(
+            return_value=httpx.Response(200, json={"id": f"chatcmpl-{i}", "choices": []})
+        )
+        for i, url in enumerate(fleet)
+    ]
+    fake_cache = DictCache()
+
+    with patch("app.api.v1.openai.upstream_pool", UpstreamPool(fleet)), patch(
+        "app.api.v1.openai.cache", fake_cache
+    ):
+        for _ in range(4):
+            response = client.post(
+                "/v1/chat/completions",
+                json={"model": "test-model", "messages": [{"role": "user", "content": "Hi"}]},
+                headers={"Authorization": TEST_AUTH_HEADER},
+            )
+            assert response.status_code == 200
+
+    assert [route.call_count for route in routes] == [2, 2]
+    assert set(fake_cache.values) == {"chatcmpl-0", "chatcmpl-1"}
+    assert fake_cache.writes == 4
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(assert_all_called=False)
+async def test_chat_completions_with_prefix_routing_stay_on_one_backend(respx_mock):
+    from app.upstream.pool import PREFIX, UpstreamPool
+
+    fleet = ["http://vllm-a:8000", "http://vllm-b:8000"]
+    routes = [
+        respx_mock.post(f"{url}/v1/chat/completions").mock(
+            return_value=httpx.Response(200, json={"id": f"chatcmpl-{i}", "choices": []})
+        )
+        for i, url in enumerate(fleet)
+    ]
+    messages = [{"role": "system", "content": "You are terse."}, {"role": "user", "content": "Hi"}]
+
+    with patch("app.api.v1.openai.upstream_pool", UpstreamPool(fleet, routing=PREFIX)), patch(
+        "app.api.v1.openai.cache", DictCache()
+    ):
+        for turn in range(4):
+            messages = messages + [
+                {"role": "assistant", "content": f"Answer {turn}"},
+                {"role": "user", "content": f"Question {turn}"},
+            ]
+            response = client.post(
+                "/v1/chat/completions",
+                json={"model": "test-model", "messages": messages},
+                headers={"Authorization": TEST_AUTH_HEADER},
+            )
+            assert response.status_code == 200
+
+    assert sorted(route.call_count for route in routes) == [0, 4]
+
+
+def test_chat_completions_rejected_when_backends_are_full():
+    from app.upstream.admission import AdmissionQueue
+    from app.upstream.pool import UpstreamPool
+
+    pool = UpstreamPool(
+        ["http://vllm-a:8000"], max_inflight=1, admission=AdmissionQueue(max_queue=0, retry_after=2)
+    )
+    pool.backends[0].acquire()
+
+    with patch("app.api.v1.openai.upstream_pool", pool):
+        response = client.post(
+            "/v1/chat/completions",
+            json={"model": "test-model", "messages": [{"role": "user", "content": "Hi"}]},
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert response.json()["error"]["type"] == "too_many_requests"
+
+
+class DisconnectingRequest:
+    """Client request whose client goes away after `after` seconds."""
+
+    def __init__(self, after):
+        self.after = after
+
+    async def receive(self):
+        await asyncio.sleep(self.after)
+        return {"type": "http.disconnect"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(assert_all_called=False)
+async def test_non_stream_request_cancelled_when_client_disconnects(respx_mock):
+    from app.api.v1.openai import CHAT_COMPLETIONS_PATH, non_stream_vllm_response, upstream_pool
+
+    upstream_cancelled = asyncio.Event()
+
+    async def slow_generation(request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+        return httpx.Response(200, json={"id": "chatcmpl-abandoned"})
+
+    respx_mock.post(VLLM_URL).mock(side_effect=slow_generation)
+    body = b'{"model": "test-model", "messages": [{"role": "user", "content": "Hi"}]}'
+    fake_cache = DictCache()
+
+    with patch("app.api.v1.openai.cache", fake_cache):
+        response = await non_stream_vllm_response(
+            CHAT_COMPLETIONS_PATH, body, body, request=DisconnectingRequest(0.05)
+        )
+
+    assert response.status_code == 499
+    assert upstream_cancelled.is_set()
+    assert fake_cache.writes == 0
+    assert all(backend.inflight == 0 for backend in upstream_pool.backends)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_stream_stops_and_skips_signing_when_client_disconnects(respx_mock):
+    from app.api.helper.disconnect import CLIENT_DISCONNECTS
+    from app.api.v1.openai import CHAT_COMPLETIONS_PATH, stream_vllm_response, upstream_pool
+
+    sent = []
+    upstream_closed = asyncio.Event()
+
+    async def slow_tokens():
+        try:
+            for i in range(50):
+                await asyncio.sleep(0.01)
+                sent.append(i)
+                yield f'data: {{"id": "chatcmpl-abandoned", "n": {i}}}\n\n'.encode()
+        finally:
+            upstream_closed.set()
+
+    respx_mock.post(VLLM_URL).mock(
+        return_value=httpx.Response(
+            200, stream=slow_tokens(), headers={"Content-Type": "text/event-stream"}
+        )
+    )
+    body = b'{"model": "test-model", "messages": [{"role": "user", "content": "Hi"}], "stream": true}'
+    fake_cache = DictCache()
+
+    disconnects = CLIENT_DISCONNECTS.value(mode="stream")
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    with patch("app.api.v1.openai.cache", fake_cache):
+        response = await stream_vllm_response(CHAT_COMPLETIONS_PATH, body, body)
+        # Served the way Starlette does: the body is cancelled when the client disconnects
+        await response({"type": "http"}, DisconnectingRequest(0.05).receive, send)
+
+    chunks = [m["body"] for m in messages if m["type"] == "http.response.body" and m["body"]]
+    assert 0 < len(chunks) < 50
+    assert CLIENT_DISCONNECTS.value(mode="stream") == disconnects + 1
+    assert len(sent) < 50
+    assert upstream_closed.is_set()
+    assert fake_cache.writes == 0
+    assert all(backend.inflight == 0 for backend in upstream_pool.backends)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_failed_streams_release_their_backend(respx_mock):
+    from app.api.v1.openai import CHAT_COMPLETIONS_PATH, stream_vllm_response, upstream_pool
+    from app.upstream.client import upstream
+
+    async def no_id():
+        yield b'data: {"object": "chat.completion.chunk"}\n\n'
+
+    respx_mock.post(VLLM_URL).mock(
+        side_effect=lambda request: httpx.Response(
+            200, stream=no_id(), headers={"Content-Type": "text/event-stream"}
+        )
+    )
+    body = b'{"model": "test-model", "messages": [{"role": "user", "content": "Hi"}], "stream": true}'
+
+    for _ in range(3):
+        response = await stream_vllm_response(CHAT_COMPLETIONS_PATH, body, body)
+        with pytest.raises(Exception, match="Chat id could not be extracted"):
+            async for _ in response.body_iterator:
+                pass
+        # Starlette does not run the background task when the body raises
+
+    assert all(backend.inflight == 0 for backend in upstream_pool.backends)
+    assert not upstream._streams
+
+
+@pytest.mark.respx
+def test_metrics_scrape_every_backend_and_models_bypass_admission(respx_mock):
+    from app.upstream.admission import AdmissionQueue
+    from app.upstream.pool import UpstreamPool
+
+    fleet = ["http://vllm-a:8000", "http://vllm-b:8000"]
+    for waiting, url in zip((1, 4), fleet):
+        respx_mock.get(f"{url}/metrics").mock(
+            return_value=httpx.Response(
+                200, text=f"# TYPE vllm:num_requests_waiting gauge\nvllm:num_requests_waiting {waiting}.0\n"
+            )
+        )
+    models_route = respx_mock.get(f"{fleet[0]}/v1/models").mock(
+        return_value=httpx.Response(200, json={"data": [{"id": "test-model"}]})
+    )
+    # Every backend is at its in-flight limit and the admission queue is full
+    pool = UpstreamPool(fleet, max_inflight=1, admission=AdmissionQueue(max_queue=0))
+    for backend in pool.backends:
+        backend.acquire()
+
+    with patch("app.api.v1.openai.upstream_pool", pool):
+        metrics_response = client.get("/v1/metrics")
+        models_response = client.get("/v1/models")
+
+    assert metrics_response.status_code == 200
+    assert 'vllm:num_requests_waiting{backend="http://vllm-a:8000"} 1.0' in metrics_response.text
+    assert 'vllm:num_requests_waiting{backend="http://vllm-b:8000"} 4.0' in metrics_response.text
+    assert metrics_response.text.count("# TYPE vllm:num_requests_waiting gauge") == 1
+    assert models_response.status_code == 200
+    assert models_route.call_count == 1
+    assert [backend.inflight for backend in pool.backends] == [1, 1]
+
+
+def test_completions_rejected_after_queue_deadline():
+    from app.upstream.admission import AdmissionQueue
+    from app.upstream.pool import UpstreamPool
+
+    pool = UpstreamPool(
+        ["http://vllm-a:8000"], max_inflight=1, admission=AdmissionQueue(timeout=0.01, retry_after=3)
+    )
+    pool.backends[0].acquire()
+
+    with patch("app.api.v1.openai.upstream_pool", pool):
+        response = client.post(
+            "/v1/completions",
+            json={"model": "test-model", "prompt": "Hi", "stream": True},
+            headers={"Authorization": TEST_AUTH_HEADER},
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json()["error"]["type"] == "service_unavailable"
+
+
+
+@pytest.mark.asyncio
+async def test_compact_record_of_this_server_survives_a_lost_signer_entry():
+    from app.api.v1.openai import ecdsa_context, ed25519_context
+    from app.signing.record import COMPACT, encode_record
+
+    record = dict(
+        text="ab" * 32 + ":" + "cd" * 32,
+        signature_ecdsa="0x" + "11" * 65,
+        signing_address_ecdsa=ecdsa_context.signing_address,
+        signature_ed25519="22" * 64,
+        signing_address_ed25519=ed25519_context.signing_address,
+    )
+    key_id, value = encode_record(record, COMPACT)
+    fake_cache = DictCache()
+    fake_cache.values["chatcmpl-compact"] = value
+
+    with patch("app.api.v1.openai.cache", fake_cache):
+        response = client.get(
+            "/v1/signature/chatcmpl-compact", headers={"Authorization": TEST_AUTH_HEADER}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["signing_address"] == ecdsa_context.signing_address
+    assert f"signer:{key_id}" in fake_cache.values
+
+
+@pytest.mark.parametrize(
+    "env, refused",
+    [({}, False), ({"REDIS_HOST": "redis"}, True), ({"WEB_CONCURRENCY": "4"}, True)],
+    ids=["single-process", "shared-redis", "several-workers"],
+)
+def test_lazy_signing_requires_a_private_cache(env, refused):
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    root = Path(__file__).resolve().parents[2]
+    code = (
+        "import sys\n"
+        "from tests.app.test_helpers import setup_test_environment\n"
+        "setup_test_environment()\n"
+        "sys.modules['app.quote.quote'] = __import__('tests.app.mock_quote', fromlist=[''])\n"
+        "import app.signing.chat\n"
+    )
+    child_env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("REDIS_HOST", "WEB_CONCURRENCY")
+    }
+    child_env.update(env, SIGNING_MODE="lazy", PYTHONPATH=os.pathsep.join([str(root / "src"), str(root)]))
+
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, env=child_env, capture_output=True, text=True
+    )
+
+    assert (result.returncode != 0) == refused, result.stderr
+    if refused:
+        assert "SIGNING_MODE=lazy requires a single worker" in result.stderr
@@ -0,0 +1,47 @@
+import pytest
+
+from app.api.helper.sse import SSEFramer, extract_id
+
+
+def test_framer_joins_events_split_across_chunks():
+    framer = SSEFramer()
+
+    assert list(framer.feed(b'data: {"id": "chat')) == []
+    assert list(framer.feed(b'cmpl-1"}\n')) == []
+    assert list(framer.feed(b'\ndata: [DONE]\n\n')) == [b'{"id": "chatcmpl-1"}', b"[DONE]"]
+
+
+def test_framer_splits_coalesced_events():
+    framer = SSEFramer()
+
+    events = list(framer.feed(b'data: {"id": "a"}\n\ndata: {"id": "b"}\r\n\r\n: keep-alive\n\n'))
+
+    assert events == [b'{"id": "a"}', b'{"id": "b"}']
+
+
+def test_framer_joins_multiline_data():
+    framer = SSEFramer()
+
+    assert list(framer.feed(b"event: message\ndata: first\ndata:second\n\n")) == [b"first\nsecond"]
+
+
+def test_framer_rejects_oversized_event():
+    framer = SSEFramer(max_buffer=16)
+
+    with pytest.raises(ValueError):
+        list(framer.feed(b"data: " + b"x" * 32))
+
+
+def test_extract_id_prefix_scan():
+    assert extract_id(b'{"id":"chatcmpl-123","object":"chat.completion.chunk"}') == "chatcmpl-123"
+
+
+def test_extract_id_falls_back_to_full_parse():
+    assert extract_id(b'{"object": "chat.completion", "id": "chatcmpl-456"}') == "chatcmpl-456"
+    assert extract_id(b'{"id": "chat\\u0063mpl-789"}') == "chatcmpl-789"
+    assert extract_id(b'{"error": {"message": "boom"}}') is None
+
+
+def test_extract_id_invalid_json():
+    with pytest.raises(ValueError):
+        extract_id(b'{"object": "chat.compl')
@@ -0,0 +1,194 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.upstream.admission import BATCH, INTERACTIVE, AdmissionQueue, AdmissionRejected, Lane
+from app.upstream.client import UpstreamClient
+from app.upstream.pool import UpstreamPool
+
+FLEET = [f"http://vllm-{i}:8000" for i in range(2)]
+PATH = "/v1/completions"
+
+
+class SlowBackend:
+    """Answers after a delay, recording request order and peak concurrency."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.order = []
+
+    async def __call__(self, request):
+        self.order.append(request.content.decode())
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return httpx.Response(200, json={"id": "cmpl-admitted"})
+
+
+def make_pool(respx_mock, delay, fleet=FLEET, **queue):
+    backends = [SlowBackend(delay) for _ in fleet]
+    for url, backend in zip(fleet, backends):
+        respx_mock.post(url + PATH).mock(side_effect=backend)
+    pool = UpstreamPool(fleet, client=UpstreamClient(), max_inflight=2, admission=AdmissionQueue(**queue))
+    return pool, backends
+
+
+async def send(pool, body="x"):
+    try:
+        return (await pool.request("POST", PATH, content=body.encode())).status_code
+    except AdmissionRejected as exc:
+        return exc.status_code
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_in_flight_limit_queues_requests_in_order(respx_mock):
+    pool, backends = make_pool(respx_mock, delay=0.02, fleet=FLEET[:1])
+
+    statuses = await asyncio.gather(*(send(pool, str(i)) for i in range(12)))
+
+    assert statuses == [200] * 12
+    assert backends[0].peak == 2
+    assert backends[0].order == [str(i) for i in range(12)]
+    assert pool.admission.depth == 0 and not pool.admission.busy
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_full_queue_rejects_with_429(respx_mock):
+    pool, backends = make_pool(respx_mock, delay=0.05, max_queue=3)
+
+    statuses = await asyncio.gather(*(send(pool) for _ in range(10)))
+
+    # Two slots on each of the two backends plus three queued
+    assert sorted(statuses) == [200] * 7 + [429] * 3
+    assert max(backend.peak for backend in backends) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_queue_deadline_rejects_with_503(respx_mock):
+    pool, _ = make_pool(respx_mock, delay=0.3, fleet=FLEET[:1], timeout=0.05)
+
+    statuses = await asyncio.gather(*(send(pool) for _ in range(3)))
+
+    assert statuses == [200, 200, 503]
+    assert pool.admission.depth == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_cancelled_waiters_give_up_their_place(respx_mock):
+    pool, backends = make_pool(respx_mock, delay=0.05, fleet=FLEET[:1])
+
+    running = [asyncio.create_task(send(pool)) for _ in range(2)]
+    queued = [asyncio.create_task(send(pool, str(i))) for i in range(3)]
+    await asyncio.sleep(0.01)
+    queued[0].cancel()
+
+    assert await asyncio.gather(*running, *queued[1:]) == [200] * 4
+    assert backends[0].order[2:] == ["1", "2"]
+    assert not pool.admission.busy
+    assert pool.backends[0].inflight == 0
+
+
+async def grant_order(queue, lanes):
+    """Queue one waiter per lane, then free capacity one slot at a time."""
+    order = []
+
+    async def waiter(i, lane):
+        await queue.wait(lane)
+        order.append(i)
+
+    tasks = [asyncio.create_task(waiter(i, lane)) for i, lane in enumerate(lanes)]
+    await asyncio.sleep(0)
+    for _ in lanes:
+        queue.wake()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_interactive_lane_overtakes_batch_backlog():
+    queue = AdmissionQueue(weights={INTERACTIVE: 8, BATCH: 1})
+    lanes = [Lane("a", BATCH)] * 8 + [Lane("a", INTERACTIVE)] * 4
+
+    order = await grant_order(queue, lanes)
+
+    assert order == [8, 9, 10, 11, 0, 1, 2, 3, 4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_tenants_share_capacity_equally():
+    queue = AdmissionQueue(weights={INTERACTIVE: 8, BATCH: 1})
+    lanes = [Lane("a", BATCH)] * 6 + [Lane("b", BATCH)] * 3
+
+    order = await grant_order(queue, lanes)
+
+    assert order == [0, 6, 1, 7, 2, 8, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_interactive_share_under_sustained_batch_load():
+    queue = AdmissionQueue(weights={INTERACTIVE: 4, BATCH: 1})
+    lanes = [Lane("a", BATCH), Lane("a", INTERACTIVE)] * 20
+
+    order = await grant_order(queue, lanes)
+
+    # Of the first ten grants, batch gets its one-in-five share
+    assert sum(lanes[i].kind == BATCH for i in order[:10]) == 2
+
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(assert_all_called=False)
+async def test_waiters_move_to_a_readmitted_backend(respx_mock):
+    pool, backends = make_pool(respx_mock, delay=3)
+    pool.max_inflight = 1
+    pool.eject_failures = 1
+    pool.eject_seconds = 0.2
+    pool.admission.timeout = 2
+    pool._record(pool.backends[1], failed=True)
+
+    busy = asyncio.create_task(send(pool))
+    await asyncio.sleep(0.01)
+    backends[1].delay = 0
+    start = asyncio.get_running_loop().time()
+
+    # Only a release used to wake the queue, so this waited out its deadline
+    assert await send(pool) == 200
+    assert asyncio.get_running_loop().time() - start < 1
+    assert backends[1].order == ["x"]
+    busy.cancel()
+    await asyncio.gather(busy, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx(assert_all_called=False)
+async def test_grant_is_handed_on_when_only_an_excluded_backend_is_free(respx_mock):
+    pool, backends = make_pool(respx_mock, delay=0.05)
+    pool.max_inflight = 1
+    backends[0].delay = 3
+
+    blocking = [asyncio.create_task(send(pool)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    # A retry that already failed on the backend about to free up queues ahead of a fresh request
+    retry = asyncio.create_task(pool._admit((pool.backends[1],), None, Lane()))
+    await asyncio.sleep(0)
+    fresh = asyncio.create_task(send(pool, "fresh"))
+    await asyncio.sleep(0.01)
+    assert pool.admission.depth == 2
+
+    assert await asyncio.wait_for(fresh, 1) == 200
+    assert backends[1].order[-1] == "fresh"
+    assert not retry.done()
+    for task in (retry, *blocking):
+        task.cancel()
+    await asyncio.gather(retry, *blocking, return_exceptions=True)
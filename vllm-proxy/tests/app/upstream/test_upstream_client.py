@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.upstream.client import UpstreamClient
+
+UPSTREAM_URL = "http://vllm-test:8000/v1/models"
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_request_reuses_shared_client(respx_mock):
+    respx_mock.get(UPSTREAM_URL).mock(return_value=httpx.Response(200, json={"data": []}))
+    upstream = UpstreamClient(max_connections=4, max_keepalive_connections=2)
+    await upstream.start()
+    client = upstream.client
+
+    for _ in range(3):
+        response = await upstream.request("GET", UPSTREAM_URL)
+        assert response.status_code == 200
+
+    assert upstream.client is client
+    assert upstream.inflight == 0
+    assert client._transport._pool._max_connections == 4
+
+    await upstream.aclose()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_aclose_drains_open_streams(respx_mock):
+    respx_mock.get(UPSTREAM_URL).mock(return_value=httpx.Response(200, text="data: {}\n\n"))
+    upstream = UpstreamClient(drain_timeout=5)
+    response = await upstream.open_stream("GET", UPSTREAM_URL)
+    assert upstream.inflight == 1
+
+    async def finish_stream():
+        await asyncio.sleep(0.2)
+        await upstream.close(response)
+
+    closer = asyncio.create_task(finish_stream())
+    await upstream.aclose()
+
+    assert closer.done()
+    assert upstream.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_aclose_gives_up_after_drain_timeout():
+    upstream = UpstreamClient(drain_timeout=0.2)
+    upstream._requests = 1
+
+    await upstream.aclose()
+
+    assert upstream._client is None
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setattr("app.upstream.client._http2_available", lambda: False)
+    upstream = UpstreamClient(http2=True)
+
+    upstream.client
+
+    assert upstream.http2 is False
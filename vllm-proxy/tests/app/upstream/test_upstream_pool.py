@@ -0,0 +1,208 @@
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+import pytest
+
+from app.upstream.client import UpstreamClient
+from app.upstream.pool import P2C, PREFIX, UpstreamPool
+from app.upstream.prefix import prefix_key
+
+FLEET = [f"http://vllm-{i}:8000" for i in range(3)]
+PATH = "/v1/chat/completions"
+
+
+class FakeBackend:
+    """A vLLM replica that answers after a delay and remembers its peak concurrency."""
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return httpx.Response(self.status, json={"id": "chatcmpl-fleet"})
+
+
+def fake_fleet(respx_mock, backends):
+    for url, backend in zip(FLEET, backends):
+        respx_mock.post(url + PATH).mock(side_effect=backend)
+
+
+def make_pool(**kwargs):
+    return UpstreamPool(FLEET, client=UpstreamClient(), **kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_least_outstanding_spreads_concurrent_requests(respx_mock):
+    backends = [FakeBackend(delay=0.05) for _ in FLEET]
+    fake_fleet(respx_mock, backends)
+    pool = make_pool()
+
+    responses = await asyncio.gather(*(pool.request("POST", PATH) for _ in range(30)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert [backend.calls for backend in backends] == [10, 10, 10]
+    assert all(backend.inflight == 0 for backend in pool.backends)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_slow_backend_gets_fewer_requests(respx_mock):
+    backends = [FakeBackend(delay=0.2), FakeBackend(delay=0.01), FakeBackend(delay=0.01)]
+    fake_fleet(respx_mock, backends)
+    pool = make_pool(routing=P2C)
+
+    async def client_loop():
+        for _ in range(10):
+            await pool.request("POST", PATH)
+
+    await asyncio.gather(*(client_loop() for _ in range(6)))
+
+    assert backends[0].calls < backends[1].calls
+    assert backends[0].calls < backends[2].calls
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_streams_hold_their_backend_until_closed(respx_mock):
+    fake_fleet(respx_mock, [FakeBackend() for _ in FLEET])
+    pool = make_pool()
+
+    streams = [await pool.open_stream("POST", PATH) for _ in range(3)]
+    assert [backend.inflight for backend in pool.backends] == [1, 1, 1]
+
+    for response in streams:
+        await pool.close(response)
+    assert [backend.inflight for backend in pool.backends] == [0, 0, 0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_failing_backend_is_ejected_and_readmitted(respx_mock):
+    backends = [FakeBackend(status=503), FakeBackend(), FakeBackend()]
+    fake_fleet(respx_mock, backends)
+    pool = make_pool(eject_failures=2, eject_seconds=0.2)
+
+    for _ in range(30):
+        await pool.request("POST", PATH)
+    assert backends[0].calls == 2
+    assert pool.backends[0].ejected_until > time.monotonic()
+
+    # Re-admitted after the ejection period; a healthy answer clears the failures
+    backends[0].status = 200
+    await asyncio.sleep(0.25)
+    for _ in range(6):
+        await pool.request("POST", PATH)
+    assert backends[0].calls > 2
+    assert pool.backends[0].failures == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_connect_errors_are_retried_on_another_backend(respx_mock):
+    respx_mock.post(FLEET[0] + PATH).mock(side_effect=httpx.ConnectError("refused"))
+    healthy = [FakeBackend(), FakeBackend()]
+    for url, backend in zip(FLEET[1:], healthy):
+        respx_mock.post(url + PATH).mock(side_effect=backend)
+    pool = make_pool(eject_failures=1, eject_seconds=60)
+
+    picked = Counter()
+    for _ in range(6):
+        response = await pool.request("POST", PATH)
+        assert response.status_code == 200
+        picked[str(response.request.url.host)] += 1
+
+    assert "vllm-0" not in picked
+    assert pool.backends[0].ejected_until > time.monotonic()
+    assert all(backend.inflight == 0 for backend in pool.backends)
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_all_backends_down_raises_connect_error(respx_mock):
+    for url in FLEET:
+        respx_mock.post(url + PATH).mock(side_effect=httpx.ConnectError("refused"))
+    pool = make_pool()
+
+    with pytest.raises(httpx.ConnectError):
+        await pool.request("POST", PATH)
+    assert all(backend.failures == 1 for backend in pool.backends)
+
+
+def conversation(system, *turns):
+    messages = [{"role": "system", "content": system}]
+    for turn in turns:
+        messages.append({"role": "user", "content": turn})
+        messages.append({"role": "assistant", "content": f"re: {turn}"})
+    return {"messages": messages}
+
+
+def test_prefix_key_covers_system_prompt_and_first_turn():
+    first = prefix_key(conversation("You are terse.", "hi"))
+    later = prefix_key(conversation("You are terse.", "hi", "and then?", "more"))
+    assert first == later
+    assert first != prefix_key(conversation("You are terse.", "hello"))
+    assert prefix_key(conversation("You are terse.", "hi"), max_messages=0) == prefix_key(
+        conversation("You are terse.", "hello"), max_messages=0
+    )
+    assert len(prefix_key(conversation("x" * 10000, "hi"), max_bytes=64)) == 64
+    assert prefix_key({"prompt": ["abc", "def"]}) == b"abc"
+    system = list(range(1000, 1400))
+    assert prefix_key({"prompt": system + [1, 2]}, max_bytes=1000) == prefix_key(
+        {"prompt": system + [3, 4]}, max_bytes=1000
+    )
+    assert prefix_key({"prompt": [1, 500, 7]}) != prefix_key({"prompt": [1, 600, 7]})
+    assert prefix_key({"prompt": [[1, 500, 7], [1, 600]]}) == prefix_key({"prompt": [1, 500, 7]})
+    assert prefix_key({"input": "abc"}) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_prefix_routing_is_sticky(respx_mock):
+    fake_fleet(respx_mock, [FakeBackend() for _ in FLEET])
+    pool = make_pool(routing=PREFIX)
+
+    def host(response):
+        return str(response.request.url.host)
+
+    homes = {}
+    for i in range(30):
+        key = f"system prompt {i}".encode()
+        hosts = {host(await pool.request("POST", PATH, key)) for _ in range(3)}
+        assert len(hosts) == 1
+        homes[key] = hosts.pop()
+    assert len(set(homes.values())) == len(FLEET)
+
+    # Ejecting a backend only moves the prefixes it owned
+    pool.backends[0].ejected_until = time.monotonic() + 60
+    for key, home in homes.items():
+        moved = host(await pool.request("POST", PATH, key))
+        assert moved != "vllm-0"
+        if home != "vllm-0":
+            assert moved == home
+
+
+@pytest.mark.asyncio
+@pytest.mark.respx
+async def test_prefix_routing_spills_over_under_load(respx_mock):
+    backends = [FakeBackend(delay=0.05) for _ in FLEET]
+    fake_fleet(respx_mock, backends)
+    pool = make_pool(routing=PREFIX, load_factor=1.25)
+
+    await asyncio.gather(*(pool.request("POST", PATH, b"one hot prefix") for _ in range(30)))
+
+    calls = sorted(backend.calls for backend in backends)
+    assert calls[-1] > calls[0] > 0
+    assert max(backend.peak for backend in backends) <= 13
@@ -34,6 +34,16 @@ def fetch_signature(chat_id, model):
     return requests.get(url, headers=headers, timeout=30).json()
 
 
+def merkle_root_from_proof(text, proof):
+    """Fold a batch-signing inclusion proof from the leaf for text up to the Merkle root."""
+    node = sha256(b"\x00" + text.encode()).digest()
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        pair = sibling + node if step["position"] == "left" else node + sibling
+        node = sha256(b"\x01" + pair).digest()
+    return node.hex()
+
+
 def recover_signer(text, signature):
     """Recover Ethereum address from ECDSA signature."""
     message = encode_defunct(text=text)
@@ -82,9 +92,16 @@ def verify_chat(chat_id, request_body, response_text, label, model):
     print("Request hash matches:", request_hash == request_hash_server)
     print("Response hash matches:", response_hash == response_hash_server)
 
+    # Batch-signed responses sign a Merkle root that commits to the hashed text
+    signed_text = hashed_text
+    if "merkle_root" in signature_payload:
+        signed_text = signature_payload["merkle_root"]
+        proof_root = merkle_root_from_proof(hashed_text, signature_payload["merkle_proof"])
+        print("Merkle proof valid:", proof_root == signed_text)
+
     signature = signature_payload["signature"]
     signing_address = signature_payload["signing_address"]
-    recovered = recover_signer(hashed_text, signature)
+    recovered = recover_signer(signed_text, signature)
     print("Signature valid:", recovered.lower() == signing_address.lower())
 
     attestation, nonce = fetch_attestation_for(signing_address, model)